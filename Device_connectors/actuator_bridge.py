@@ -3,35 +3,109 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
+import threading
 import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
 
 from controller import state_memory as sm
+from Device_connectors import codec
 
 
 logger = logging.getLogger(__name__)
 
 ACT_STATE_RE = re.compile(r"^labs/([^/]+)/actuators/([^/]+)/state$")
 
+# Rules re-decide the same ON/OFF every tick until feedback arrives; instead of
+# re-publishing each time, remember what is in flight per actuator and resend only
+# after an exponential backoff (CMD_RETRY_BASE_SEC doubling up to CMD_RETRY_MAX_SEC).
+RETRY_BASE_SEC = float(os.getenv("CMD_RETRY_BASE_SEC", "5"))
+RETRY_MAX_SEC = float(os.getenv("CMD_RETRY_MAX_SEC", "60"))
 
-def on_actuator_state(topic: str, payload: dict):
-    match = ACT_STATE_RE.match(topic)
-    if not match:
-        return
-    lab_id, actuator_id = match.group(1), match.group(2)
-    state = str(payload.get("state", "OFF")).upper()
-    timestamp = int(payload.get("ts", int(time.time())))
+
+@dataclass
+class _InFlight:
+    action: str
+    sent_at: float
+    attempts: int
+    retry_at: float
+
+
+_inflight: Dict[Tuple[str, str], _InFlight] = {}
+_inflight_lock = threading.Lock()
+_counters = {"sent": 0, "retried": 0, "suppressed": 0, "confirmed": 0}
+
+
+def _backoff(attempts: int) -> float:
+    return min(RETRY_BASE_SEC * (2 ** (attempts - 1)), RETRY_MAX_SEC)
+
+
+def on_actuator_state(
+    topic: str,
+    payload: Union[codec.ActuatorState, dict],
+    segments: Optional[Tuple[str, ...]] = None,
+):
+    if segments is not None:
+        lab_id, actuator_id = segments
+    else:
+        match = ACT_STATE_RE.match(topic)
+        if not match:
+            return
+        lab_id, actuator_id = match.group(1), match.group(2)
+    feedback = payload if isinstance(payload, codec.ActuatorState) else codec.actuator_from_dict(payload)
+    state, timestamp = feedback.state, feedback.ts
+    with _inflight_lock:
+        pending = _inflight.get((lab_id, actuator_id))
+        if pending is not None and pending.action == state:
+            del _inflight[(lab_id, actuator_id)]
+            _counters["confirmed"] += 1
     sm.update_actuator_state(lab_id, actuator_id, state, timestamp)
     logger.debug("Actuator feedback lab=%s actuator=%s state=%s ts=%s", lab_id, actuator_id, state, timestamp)
 
 
-def send_command(mqtt_client, lab_id: str, actuator_id: str, action: str, source: str = "rules"):
+def send_command(mqtt_client, lab_id: str, actuator_id: str, action: str, source: str = "rules") -> bool:
+    """Publish a command unless the same action is already in flight for the actuator.
+
+    Rule commands repeating an unconfirmed action are suppressed until its retry
+    backoff expires; any other source (e.g. manual) always publishes. Returns True
+    if a message was published.
+    """
+    action = action.upper()
+    key = (lab_id, actuator_id)
+    now = time.time()
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is not None and pending.action == action:
+            if source == "rules" and now < pending.retry_at:
+                _counters["suppressed"] += 1
+                return False
+            attempts = pending.attempts + 1
+            _counters["retried"] += 1
+        else:
+            attempts = 1
+        _inflight[key] = _InFlight(action, now, attempts, now + _backoff(attempts))
+        _counters["sent"] += 1
     topic = f"labs/{lab_id}/actuators/{actuator_id}/cmd"
-    payload = {"action": action.upper(), "source": source, "ts": int(time.time())}
-    logger.info("Command -> topic=%s payload=%s", topic, payload)
+    payload = {"action": action, "source": source, "ts": int(now)}
+    logger.info("Command -> topic=%s payload=%s attempt=%s", topic, payload, attempts)
     mqtt_client.publish_json(topic, payload, retain=True)
+    return True
+
+
+def forget_lab(lab_id: str) -> None:
+    """Drop in-flight commands of a lab that is no longer controlled."""
+    with _inflight_lock:
+        for key in [key for key in _inflight if key[0] == lab_id]:
+            del _inflight[key]
+
+
+def command_stats() -> dict:
+    with _inflight_lock:
+        return {**_counters, "in_flight": len(_inflight)}
 
 
 def wire(mqtt_client):
-    mqtt_client.subscribe("labs/+/actuators/+/state", on_actuator_state)
+    mqtt_client.subscribe("labs/+/actuators/+/state", on_actuator_state, decoder=codec.decode_actuator, segments=True)
     logger.info("Actuator bridge listening on labs/+/actuators/+/state")
@@ -0,0 +1,192 @@
+"""Payload codecs for MQTT messages.
+
+Generic JSON goes through the fastest available backend (orjson, then msgspec,
+then the stdlib), selectable with MQTT_CODEC=auto|orjson|msgspec|json. Sensor
+and actuator payloads can also be decoded straight from bytes into small typed
+structs; with msgspec installed this skips the intermediate dict entirely.
+
+High-rate sensors may instead publish a fixed 12-byte binary reading (float32 t,
+float32 h, uint32 ts, little endian) on ``labs/<lab>/sensors/<id>/bin``; the
+sensor id is already in the topic so it is not repeated in the payload.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+logger = logging.getLogger(__name__)
+
+Decoder = Callable[[bytes], Any]
+
+
+def _select_backend(name: str) -> str:
+    name = name.lower()
+    if name == "auto":
+        if orjson is not None:
+            return "orjson"
+        if msgspec is not None:
+            return "msgspec"
+        return "json"
+    if name == "orjson" and orjson is None or name == "msgspec" and msgspec is None:
+        logger.warning("MQTT_CODEC=%s requested but not installed; using stdlib json", name)
+        return "json"
+    if name not in ("orjson", "msgspec", "json"):
+        logger.warning("Unknown MQTT_CODEC=%s; using stdlib json", name)
+        return "json"
+    return name
+
+
+BACKEND = _select_backend(os.getenv("MQTT_CODEC", "auto"))
+
+if BACKEND == "orjson":
+    loads: Decoder = orjson.loads
+    dumps: Callable[[Any], bytes] = orjson.dumps
+elif BACKEND == "msgspec":
+    loads = msgspec.json.decode
+    dumps = msgspec.json.encode
+else:
+
+    def loads(raw: bytes) -> Any:
+        return json.loads(raw)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+# ---------------------------------------------------------------------- typed payloads
+@dataclass(frozen=True)
+class SensorReading:
+    """Normalised `labs/<lab>/sensors/<id>/state` payload."""
+
+    t: float
+    h: float
+    ts: int
+    sensor_id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ActuatorState:
+    """Normalised `labs/<lab>/actuators/<id>/state` payload."""
+
+    state: str
+    ts: int
+    actuator_id: Optional[str] = None
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def sensor_from_dict(payload: dict) -> SensorReading:
+    """Build a SensorReading from a decoded dict; bad t/h become 0.0, a missing ts becomes now."""
+    return SensorReading(
+        t=_as_float(payload.get("t")),
+        h=_as_float(payload.get("h")),
+        ts=int(payload.get("ts") or time.time()),
+        sensor_id=str(payload["sensor_id"]) if payload.get("sensor_id") else None,
+    )
+
+
+def actuator_from_dict(payload: dict) -> ActuatorState:
+    return ActuatorState(
+        state=str(payload.get("state", "OFF")).upper(),
+        ts=int(payload.get("ts", int(time.time()))),
+        actuator_id=payload.get("actuator_id"),
+    )
+
+
+def sensor_batch_from_dict(payload: dict) -> List[SensorReading]:
+    """Readings of a ``{"ts": .., "readings": [{"sensor_id", "t", "h", "ts"}, ...]}`` batch.
+
+    A reading without its own ts inherits the batch ts; readings without a sensor_id
+    are skipped.
+    """
+    batch_ts = payload.get("ts")
+    out: List[SensorReading] = []
+    for item in payload.get("readings") or ():
+        if not isinstance(item, dict) or not item.get("sensor_id"):
+            continue
+        if batch_ts and not item.get("ts"):
+            item = {**item, "ts": batch_ts}
+        out.append(sensor_from_dict(item))
+    return out
+
+
+def decode_sensor_batch(raw: bytes) -> List[SensorReading]:
+    return sensor_batch_from_dict(loads(raw))
+
+
+# ---------------------------------------------------------------------- binary sensor format
+SENSOR_BIN = struct.Struct("<ffI")
+
+
+def pack_sensor(t: float, h: float, ts: int) -> bytes:
+    return SENSOR_BIN.pack(t, h, int(ts))
+
+
+def decode_sensor_bin(raw: bytes) -> SensorReading:
+    """Decode a binary sensor reading; raises struct.error on a payload of the wrong size."""
+    t, h, ts = SENSOR_BIN.unpack(raw)
+    # float32 carries ~7 significant digits; round off the representation noise
+    return SensorReading(t=round(t, 4), h=round(h, 4), ts=ts or int(time.time()))
+
+
+if msgspec is not None:
+
+    class _SensorWire(msgspec.Struct):
+        t: float = 0.0
+        h: float = 0.0
+        ts: Optional[int] = None
+        sensor_id: Optional[str] = None
+
+    class _ActuatorWire(msgspec.Struct):
+        state: str = "OFF"
+        ts: Optional[int] = None
+        actuator_id: Optional[str] = None
+
+    _sensor_decoder = msgspec.json.Decoder(_SensorWire)
+    _actuator_decoder = msgspec.json.Decoder(_ActuatorWire)
+
+    def decode_sensor(raw: bytes) -> SensorReading:
+        try:
+            wire = _sensor_decoder.decode(raw)
+        except msgspec.ValidationError:
+            # unexpected types (e.g. numbers sent as strings): take the lenient path
+            return sensor_from_dict(loads(raw))
+        return SensorReading(t=wire.t, h=wire.h, ts=wire.ts or int(time.time()), sensor_id=wire.sensor_id)
+
+    def decode_actuator(raw: bytes) -> ActuatorState:
+        try:
+            wire = _actuator_decoder.decode(raw)
+        except msgspec.ValidationError:
+            return actuator_from_dict(loads(raw))
+        ts = wire.ts if wire.ts is not None else int(time.time())
+        return ActuatorState(state=wire.state.upper(), ts=ts, actuator_id=wire.actuator_id)
+
+else:
+
+    def decode_sensor(raw: bytes) -> SensorReading:
+        return sensor_from_dict(loads(raw))
+
+    def decode_actuator(raw: bytes) -> ActuatorState:
+        return actuator_from_dict(loads(raw))
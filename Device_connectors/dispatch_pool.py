@@ -0,0 +1,153 @@
+"""Bounded worker pool that runs MQTT callbacks off paho's network thread."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List
+
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop_oldest", "coalesce")
+
+
+class _Shard:
+    def __init__(self, maxsize: int, coalesce: bool):
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        # coalesce: topic -> item (one pending message per topic); otherwise a FIFO of (topic, item)
+        self.pending: Any = OrderedDict() if coalesce else deque()
+        self.cond = threading.Condition()
+        self.max_depth = 0
+
+
+class DispatchPool:
+    """Sharded, bounded queue in front of a message handler.
+
+    Each topic is hashed to one shard and each shard has one worker, so messages
+    for a topic are handled in arrival order while different topics run in
+    parallel. When a shard is full the oldest queued message is dropped; with the
+    ``coalesce`` policy a newer message for a topic that is still queued replaces
+    the queued one instead of taking another slot.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Any], None],
+        workers: int = 4,
+        maxsize: int = 10000,
+        policy: str = "drop_oldest",
+        name: str = "mqtt_dispatch",
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown backpressure policy {policy!r}, expected one of {POLICIES}")
+        self.handler = handler
+        self.policy = policy
+        self.name = name
+        workers = max(1, int(workers))
+        per_shard = max(1, int(maxsize) // workers)
+        self._shards = [_Shard(per_shard, policy == "coalesce") for _ in range(workers)]
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._counter_lock = threading.Lock()
+        self._dropped = 0
+        self._coalesced = 0
+        self._processed = 0
+
+    # ------------------------------------------------------------------ lifecycle
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for idx, shard in enumerate(self._shards):
+            thread = threading.Thread(target=self._work, args=(shard,), name=f"{self.name}_{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(
+            "Dispatch pool started workers=%s queue_per_worker=%s policy=%s",
+            len(self._shards),
+            self._shards[0].maxsize,
+            self.policy,
+        )
+
+    def stop(self):
+        self._stop.set()
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    # ------------------------------------------------------------------ producer
+    def submit(self, topic: str, item: Any) -> None:
+        shard = self._shards[hash(topic) % len(self._shards)]
+        dropped = coalesced = 0
+        with shard.cond:
+            pending = shard.pending
+            if shard.coalesce:
+                if topic in pending:
+                    pending[topic] = item
+                    coalesced = 1
+                else:
+                    if len(pending) >= shard.maxsize:
+                        pending.popitem(last=False)
+                        dropped = 1
+                    pending[topic] = item
+            else:
+                if len(pending) >= shard.maxsize:
+                    pending.popleft()
+                    dropped = 1
+                pending.append((topic, item))
+            if len(pending) > shard.max_depth:
+                shard.max_depth = len(pending)
+            shard.cond.notify()
+        if dropped or coalesced:
+            with self._counter_lock:
+                self._dropped += dropped
+                self._coalesced += coalesced
+                total = self._dropped
+            # log at 1, 2, 4, 8, ... drops so a sustained overload does not flood the log
+            if dropped and total & (total - 1) == 0:
+                logger.warning("Dispatch queue full, dropped oldest message (total dropped=%s)", total)
+
+    # ------------------------------------------------------------------ workers
+    def _work(self, shard: _Shard):
+        while True:
+            with shard.cond:
+                while not shard.pending and not self._stop.is_set():
+                    shard.cond.wait()
+                if self._stop.is_set():
+                    return
+                if shard.coalesce:
+                    topic, item = shard.pending.popitem(last=False)
+                else:
+                    topic, item = shard.pending.popleft()
+            try:
+                self.handler(topic, item)
+            except Exception as exc:
+                logger.exception("Dispatch handler error for topic %s: %s", topic, exc)
+            with self._counter_lock:
+                self._processed += 1
+
+    # ------------------------------------------------------------------ metrics
+    def stats(self) -> Dict[str, Any]:
+        depths = []
+        high_water = 0
+        for shard in self._shards:
+            with shard.cond:
+                depths.append(len(shard.pending))
+                high_water = max(high_water, shard.max_depth)
+        with self._counter_lock:
+            return {
+                "policy": self.policy,
+                "workers": len(self._shards),
+                "queue_depth": sum(depths),
+                "queue_depth_per_worker": depths,
+                "queue_high_water": high_water,
+                "processed": self._processed,
+                "dropped": self._dropped,
+                "coalesced": self._coalesced,
+            }
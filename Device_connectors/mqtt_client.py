@@ -2,41 +2,73 @@
 
 from __future__ import annotations
 
-import json
 import logging
+import os
 import threading
 import time
 from dataclasses import dataclass
-from typing import Callable, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import paho.mqtt.client as mqtt
 
+from Device_connectors import codec
+from Device_connectors.dispatch_pool import DispatchPool
+from Device_connectors.topic_trie import TopicTrie
+
 
 logger = logging.getLogger(__name__)
 _dropped_messages = 0
 
 
-JsonCallback = Callable[[str, dict], None]
+JsonCallback = Callable[..., None]
 
 
-@dataclass
+@dataclass(frozen=True)
 class _Subscription:
     topic: str
     callback: JsonCallback
+    decoder: codec.Decoder = codec.loads
+    segments: bool = False
 
 
 class MqttClient:
-    """MQTT helper that handles auto-reconnects, wildcard subscriptions and JSON payloads."""
-
-    def __init__(self, client_id: str, host: str = "localhost", port: int = 1883, keepalive: int = 60):
+    """MQTT helper that handles auto-reconnects, wildcard subscriptions and JSON payloads.
+
+    With ``workers`` > 0 (or MQTT_WORKERS), decoding and callbacks run on a
+    DispatchPool instead of paho's network thread; see MQTT_QUEUE_SIZE and
+    MQTT_BACKPRESSURE for its bounds and overflow policy.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        host: str = "localhost",
+        port: int = 1883,
+        keepalive: int = 60,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        backpressure: Optional[str] = None,
+    ):
         self.client = mqtt.Client(client_id=client_id, clean_session=True)
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
         self.host, self.port, self.keepalive = host, port, keepalive
         self._subs: List[_Subscription] = []
+        self._trie: TopicTrie[_Subscription] = TopicTrie()
         self._lock = threading.Lock()
         self._connected = threading.Event()
+        if workers is None:
+            workers = int(os.getenv("MQTT_WORKERS", "0"))
+        self._pool: Optional[DispatchPool] = None
+        if workers > 0:
+            self._pool = DispatchPool(
+                self._deliver,
+                workers=workers,
+                maxsize=queue_size or int(os.getenv("MQTT_QUEUE_SIZE", "10000")),
+                policy=backpressure or os.getenv("MQTT_BACKPRESSURE", "drop_oldest"),
+                name=f"{client_id}_dispatch",
+            )
 
     # --------------------------------------------------------------------- #
     # MQTT event handlers
@@ -60,30 +92,43 @@ class MqttClient:
                 time.sleep(2)
 
     def _on_message(self, _client, _userdata, msg):
-        callbacks: List[JsonCallback] = []
-        with self._lock:
-            for sub in self._subs:
-                if mqtt.topic_matches_sub(sub.topic, msg.topic):
-                    callbacks.append(sub.callback)
-        if not callbacks:
-            return
-        try:
-            payload = json.loads(msg.payload.decode("utf-8"))
-        except Exception:
-            payload = {}
-            global _dropped_messages
-            _dropped_messages += 1
-            logger.warning("MQTT dropped malformed payloads=%s topic=%s", _dropped_messages, msg.topic)
+        subs, segments = self._trie.match_segments(msg.topic)
+        if not subs:
             return
-        logger.debug("MQTT message topic=%s matched_callbacks=%s", msg.topic, len(callbacks))
-        for cb in callbacks:
+        if self._pool is not None:
+            self._pool.submit(msg.topic, (msg.payload, subs, segments))
+        else:
+            self._deliver(msg.topic, (msg.payload, subs, segments))
+
+    def _deliver(self, topic: str, item: Tuple[bytes, Tuple[_Subscription, ...], Tuple[Tuple[str, ...], ...]]):
+        global _dropped_messages
+        raw, subs, segments = item
+        # decode once per distinct decoder, straight from the raw bytes
+        decoded: Dict[codec.Decoder, Any] = {}
+        logger.debug("MQTT message topic=%s matched_callbacks=%s", topic, len(subs))
+        for sub, captured in zip(subs, segments):
+            if sub.decoder in decoded:
+                payload = decoded[sub.decoder]
+            else:
+                try:
+                    payload = sub.decoder(raw)
+                except Exception:
+                    _dropped_messages += 1
+                    logger.warning("MQTT dropped malformed payloads=%s topic=%s", _dropped_messages, topic)
+                    continue
+                decoded[sub.decoder] = payload
             try:
-                cb(msg.topic, payload)
+                if sub.segments:
+                    sub.callback(topic, payload, captured)
+                else:
+                    sub.callback(topic, payload)
             except Exception as exc:
-                logger.exception("MQTT callback error for topic %s: %s", msg.topic, exc)
+                logger.exception("MQTT callback error for topic %s: %s", topic, exc)
 
     # ------------------------------------------------------------------ API
     def connect(self):
+        if self._pool is not None:
+            self._pool.start()
         self.client.reconnect_delay_set(min_delay=2, max_delay=30)
         self.client.loop_start()
         try:
@@ -98,18 +143,49 @@ class MqttClient:
         else:
             logger.info("Connecting to MQTT broker at %s:%s", self.host, self.port)
 
-    def subscribe(self, topic: str, callback: JsonCallback):
-        """Subscribe to a topic pattern (`+`/`#` supported) with a JSON callback."""
+    def subscribe(
+        self,
+        topic: str,
+        callback: JsonCallback,
+        decoder: Optional[codec.Decoder] = None,
+        segments: bool = False,
+    ):
+        """Subscribe to a topic pattern (`+`/`#` supported).
+
+        The callback receives the payload decoded by ``decoder`` (generic JSON by
+        default; e.g. ``codec.decode_sensor`` for a typed SensorReading). With
+        ``segments`` it is called as ``callback(topic, payload, segments)`` where
+        segments are the topic levels that filled the pattern's wildcards, e.g.
+        ``("lab1", "s1")`` for ``labs/+/sensors/+/state``.
+        """
+        sub = _Subscription(topic=topic, callback=callback, decoder=decoder or codec.loads, segments=segments)
         with self._lock:
-            self._subs.append(_Subscription(topic=topic, callback=callback))
+            self._subs.append(sub)
+            self._trie.add(topic, sub)
         self.client.subscribe(topic, qos=1)
         logger.info("Subscribed to %s", topic)
 
     def publish_json(self, topic: str, obj: dict, retain: bool = True):
-        payload = json.dumps(obj)
-        logger.info("Publishing to %s payload=%s", topic, payload)
+        payload = codec.dumps(obj)
+        logger.info("Publishing to %s payload=%s", topic, obj)
+        self.client.publish(topic, payload, qos=1, retain=retain)
+
+    def publish_raw(self, topic: str, payload: bytes, retain: bool = True):
+        """Publish an already-encoded payload (e.g. ``codec.pack_sensor``) as-is."""
+        logger.debug("Publishing to %s bytes=%s", topic, len(payload))
         self.client.publish(topic, payload, qos=1, retain=retain)
 
     def disconnect(self):
         self.client.loop_stop()
         self.client.disconnect()
+        if self._pool is not None:
+            self._pool.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Dispatch metrics: queue depth, drops and throughput (inline mode reports only drops)."""
+        out: Dict[str, Any] = {"malformed_dropped": _dropped_messages, "subscriptions": len(self._subs)}
+        if self._pool is not None:
+            out.update(self._pool.stats())
+        else:
+            out["workers"] = 0
+        return out
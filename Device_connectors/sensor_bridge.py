@@ -3,31 +3,123 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
-import time
+import threading
+from typing import Dict, List, Optional, Tuple, Union
 
 from controller import state_memory as sm
+from Device_connectors import codec
 
 
 logger = logging.getLogger(__name__)
 
-SENSOR_RE = re.compile(r"^labs/([^/]+)/sensors/([^/]+)/state$")
+SENSOR_RE = re.compile(r"^labs/([^/]+)/sensors/([^/]+)/(?:state|bin)$")
+SENSOR_BATCH_RE = re.compile(r"^labs/([^/]+)/sensors/batch$")
 
 
-def on_sensor_message(topic: str, payload: dict):
-    match = SENSOR_RE.match(topic)
-    if not match:
-        return
-    lab_id, sensor_id = match.group(1), match.group(2)
-    try:
-        temperature = float(payload.get("t"))
-    except (TypeError, ValueError):
-        temperature = 0.0
-    try:
-        humidity = float(payload.get("h"))
-    except (TypeError, ValueError):
-        humidity = 0.0
-    timestamp = int(payload.get("ts") or time.time())
+class SensorCoalescer:
+    """Keep only the newest reading per sensor between processing rounds.
+
+    The MQTT callback just parks the reading in a dict keyed by (lab_id, sensor_id);
+    a single drain thread applies whatever is pending to state_memory. During a burst
+    (e.g. retained messages replayed on reconnect) older readings for the same sensor
+    are overwritten before they are ever processed. ``interval_sec`` optionally waits
+    between rounds to collect more updates per round. The timestamp last handed to
+    state_memory is kept per sensor, so a late older reading is dropped even after
+    the newer one has already been drained.
+    """
+
+    def __init__(self, interval_sec: float = 0.0):
+        self.interval_sec = max(0.0, float(interval_sec))
+        self._pending: Dict[Tuple[str, str], Tuple[float, float, int]] = {}
+        self._applied: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._drain_loop, name="sensor_coalescer", daemon=True)
+        self._thread.start()
+        logger.info("Sensor coalescing enabled interval=%ss", self.interval_sec)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def offer(self, lab_id: str, sensor_id: str, temperature: float, humidity: float, timestamp: int):
+        key = (lab_id, sensor_id)
+        with self._lock:
+            self.received += 1
+            applied = self._applied.get(key)
+            if applied is not None and timestamp < applied:
+                # an older (e.g. retained) reading arrived after a newer one was applied
+                self.stale += 1
+                return
+            current = self._pending.get(key)
+            if current is not None:
+                if timestamp < current[2]:
+                    self.stale += 1
+                    return
+                self.coalesced += 1
+            self._pending[key] = (temperature, humidity, timestamp)
+        self._wake.set()
+
+    def drain(self) -> int:
+        """Apply all pending readings to state_memory; return how many were applied."""
+        by_lab: Dict[str, List[Tuple[str, float, float, int]]] = {}
+        applied = 0
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            for key, (temperature, humidity, timestamp) in batch.items():
+                last = self._applied.get(key)
+                if last is not None and timestamp < last:
+                    # a concurrent drain already took a newer reading for this sensor
+                    self.stale += 1
+                    continue
+                # recorded before applying so offer() rejects older readings meanwhile
+                self._applied[key] = timestamp
+                by_lab.setdefault(key[0], []).append((key[1], temperature, humidity, timestamp))
+                applied += 1
+        for lab_id, readings in by_lab.items():
+            sm.update_sensors(lab_id, readings)
+        return applied
+
+    def _drain_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self.interval_sec and self._stop.wait(self.interval_sec):
+                break
+            try:
+                self.drain()
+            except Exception as exc:
+                logger.error("Sensor coalescer drain failed: %s", exc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "stale": self.stale,
+                "pending": len(self._pending),
+            }
+
+
+_coalescer: Optional[SensorCoalescer] = None
+
+
+def _apply(lab_id: str, sensor_id: str, temperature: float, humidity: float, timestamp: int):
     sm.update_sensor(lab_id, sensor_id, temperature, humidity, timestamp)
     logger.debug(
         "Sensor update lab=%s sensor=%s t=%.2f h=%.2f ts=%s",
@@ -39,6 +131,59 @@ def on_sensor_message(topic: str, payload: dict):
     )
 
 
-def wire(mqtt_client):
-    mqtt_client.subscribe("labs/+/sensors/+/state", on_sensor_message)
-    logger.info("Sensor bridge listening on labs/+/sensors/+/state")
+def on_sensor_message(
+    topic: str,
+    payload: Union[codec.SensorReading, dict],
+    segments: Optional[Tuple[str, ...]] = None,
+):
+    if segments is not None:
+        lab_id, sensor_id = segments
+    else:
+        match = SENSOR_RE.match(topic)
+        if not match:
+            return
+        lab_id, sensor_id = match.group(1), match.group(2)
+    reading = payload if isinstance(payload, codec.SensorReading) else codec.sensor_from_dict(payload)
+    if _coalescer is not None:
+        _coalescer.offer(lab_id, sensor_id, reading.t, reading.h, reading.ts)
+    else:
+        _apply(lab_id, sensor_id, reading.t, reading.h, reading.ts)
+
+
+def on_sensor_batch(
+    topic: str,
+    payload: Union[List[codec.SensorReading], dict],
+    segments: Optional[Tuple[str, ...]] = None,
+):
+    """Handle ``labs/<lab>/sensors/batch``: many readings applied to the lab in one update."""
+    if segments is not None:
+        (lab_id,) = segments
+    else:
+        match = SENSOR_BATCH_RE.match(topic)
+        if not match:
+            return
+        lab_id = match.group(1)
+    readings = payload if isinstance(payload, list) else codec.sensor_batch_from_dict(payload)
+    if _coalescer is not None:
+        for reading in readings:
+            _coalescer.offer(lab_id, reading.sensor_id, reading.t, reading.h, reading.ts)
+        return
+    sm.update_sensors(lab_id, ((r.sensor_id, r.t, r.h, r.ts) for r in readings))
+
+
+def wire(mqtt_client, coalesce: Optional[bool] = None):
+    """Subscribe to sensor topics; with coalesce (or SENSOR_COALESCE=1) ingest keeps only the newest reading per sensor."""
+    global _coalescer
+    if coalesce is None:
+        coalesce = os.getenv("SENSOR_COALESCE", "0").lower() in ("1", "true", "yes")
+    if coalesce and _coalescer is None:
+        _coalescer = SensorCoalescer(interval_sec=float(os.getenv("SENSOR_COALESCE_SEC", "0")))
+        _coalescer.start()
+    mqtt_client.subscribe("labs/+/sensors/+/state", on_sensor_message, decoder=codec.decode_sensor, segments=True)
+    mqtt_client.subscribe("labs/+/sensors/+/bin", on_sensor_message, decoder=codec.decode_sensor_bin, segments=True)
+    mqtt_client.subscribe("labs/+/sensors/batch", on_sensor_batch, decoder=codec.decode_sensor_batch, segments=True)
+    logger.info("Sensor bridge listening on labs/+/sensors/+/state, .../bin and labs/+/sensors/batch")
+
+
+def coalescer_stats() -> dict:
+    return _coalescer.stats() if _coalescer is not None else {}
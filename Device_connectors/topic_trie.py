@@ -0,0 +1,111 @@
+"""Subscription trie for MQTT topic filters with `+` / `#` wildcard support."""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Generic, List, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Node:
+    __slots__ = ("children", "values", "multi")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # (seq, value, capture positions) for filters ending here / ending in '#' here
+        self.values: Tuple[tuple, ...] = ()
+        self.multi: Tuple[tuple, ...] = ()
+
+
+class TopicTrie(Generic[T]):
+    """Map MQTT topic filters to values and look up all values matching a topic.
+
+    Matching walks one trie level per topic segment, so it costs O(topic depth)
+    instead of one ``topic_matches_sub`` call per subscription. Results are cached
+    per concrete topic. Readers take no lock: writers replace node tuples and the
+    cache dict instead of mutating what a reader might be looking at.
+
+    ``match_segments`` additionally returns, per value, the topic levels that filled
+    the filter's ``+`` wildcards (and the remainder for a trailing ``#``), so callers
+    get e.g. (lab_id, sensor_id) without parsing the topic again.
+    """
+
+    def __init__(self, max_cache: int = 65536):
+        self.max_cache = max_cache
+        self._root = _Node()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[Tuple[T, ...], Tuple[Tuple[str, ...], ...]]] = {}
+
+    def add(self, topic_filter: str, value: T) -> None:
+        with self._lock:
+            self._seq += 1
+            levels = topic_filter.split("/")
+            captures = tuple((idx, level == "#") for idx, level in enumerate(levels) if level in ("+", "#"))
+            entry = (self._seq, value, captures)
+            node = self._root
+            for idx, level in enumerate(levels):
+                if level == "#" and idx == len(levels) - 1:
+                    node.multi = node.multi + (entry,)
+                    break
+                child = node.children.get(level)
+                if child is None:
+                    child = _Node()
+                    node.children[level] = child
+                node = child
+            else:
+                node.values = node.values + (entry,)
+            self._cache = {}
+
+    def match(self, topic: str) -> Tuple[T, ...]:
+        """Return values of every filter matching topic, in the order they were added."""
+        return self._lookup(topic)[0]
+
+    def match_segments(self, topic: str) -> Tuple[Tuple[T, ...], Tuple[Tuple[str, ...], ...]]:
+        """Return (values, segments) where segments[i] holds the wildcard levels captured for values[i]."""
+        return self._lookup(topic)
+
+    def _lookup(self, topic: str) -> Tuple[Tuple[T, ...], Tuple[Tuple[str, ...], ...]]:
+        cache = self._cache
+        hit = cache.get(topic)
+        if hit is not None:
+            return hit
+        found: List[tuple] = []
+        levels = topic.split("/")
+        # topics starting with '$' are not matched by wildcards at the first level
+        system = topic.startswith("$")
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            wildcards_ok = not (system and depth == 0)
+            if wildcards_ok and node.multi:
+                # 'a/#' also matches 'a' itself
+                found.extend(node.multi)
+            if depth == len(levels):
+                found.extend(node.values)
+                continue
+            child = node.children.get(levels[depth])
+            if child is not None:
+                stack.append((child, depth + 1))
+            if wildcards_ok:
+                child = node.children.get("+")
+                if child is not None:
+                    stack.append((child, depth + 1))
+        found.sort(key=lambda entry: entry[0])
+        values = tuple(entry[1] for entry in found)
+        segments = tuple(self._captured(levels, entry[2]) for entry in found)
+        result = (values, segments)
+        if len(cache) >= self.max_cache:
+            cache.clear()
+        cache[topic] = result
+        return result
+
+    @staticmethod
+    def _captured(levels: List[str], captures: Tuple[Tuple[int, bool], ...]) -> Tuple[str, ...]:
+        # a trailing '#' captures the rest of the topic ("" when it matched the parent level)
+        return tuple("/".join(levels[idx:]) if multi else levels[idx] for idx, multi in captures)
+
+    def __len__(self) -> int:
+        return self._seq
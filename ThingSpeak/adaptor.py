@@ -15,6 +15,9 @@ logger = logging.getLogger("ThingSpeakAdaptor")
 
 DEFAULT_CONFIG = {"channels": []}
 
+# last /status body and its ETag, reused when the registry answers 304 Not Modified
+_last_status: Dict[str, Any] = {"etag": None, "status": None}
+
 
 def load_config(path: str) -> dict:
     if not os.path.exists(path):
@@ -60,10 +63,15 @@ def post_field(api_key: str, field_num: int, value: Any, base_url: str) -> None:
 
 
 def run_once(api_url: str, config: dict, base_url: str) -> None:
+    headers = {"If-None-Match": _last_status["etag"]} if _last_status["etag"] else {}
     try:
-        resp = requests.get(f"{api_url.rstrip('/')}/status", timeout=10)
-        resp.raise_for_status()
-        status = resp.json()
+        resp = requests.get(f"{api_url.rstrip('/')}/status", timeout=10, headers=headers)
+        if resp.status_code == 304 and _last_status["status"] is not None:
+            status = _last_status["status"]
+        else:
+            resp.raise_for_status()
+            status = resp.json()
+            _last_status.update(etag=resp.headers.get("ETag"), status=status)
     except Exception as exc:
         logger.error("Failed to fetch status from registry: %s", exc)
         return
@@ -26,6 +26,8 @@ ALERT_COOLDOWN_SEC = int(os.getenv("ALERT_COOLDOWN_SEC", "120"))
 
 KNOWN_CHATS = set()
 _last_alert = {}
+# url -> (etag, body); lets repeated GETs (mostly /status) be answered with 304 Not Modified
+_etag_cache = {}
 
 
 def load_permissions():
@@ -66,12 +68,26 @@ def get_labs():
 
 def _get(endpoint):
     url = f"{REGISTRY_API.rstrip('/')}/{endpoint.lstrip('/')}"
+    cached = _etag_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else {}
     try:
-        r = requests.get(url, timeout=5)
+        r = requests.get(url, timeout=5, headers=headers)
+        if r.status_code == 304 and cached:
+            return cached[1]
         r.raise_for_status()
-        return r.json()
+        data = r.json()
     except Exception:
         return {"error": "registry unreachable"}
+    etag = r.headers.get("ETag")
+    if etag:
+        _etag_cache[url] = (etag, data)
+    return data
+
+
+def get_lab_status(lab_id):
+    """Status entry of one lab from the registry's /status/<lab_id>, or None if unknown."""
+    lab = _get(f"status/{lab_id}")
+    return lab if lab.get("lab_id") else None
 
 
 def _post(endpoint, payload):
@@ -332,13 +348,12 @@ def handle(msg):
 
 
 def do_all(chat_id, lab_id, action):
-    status = _get("status")
-    labs = [l for l in status.get("labs", []) if l.get("lab_id") == lab_id]
-    if not labs:
+    lab = get_lab_status(lab_id)
+    if not lab:
         bot.sendMessage(chat_id, "Lab not found.")
         return
     errors = []
-    for act in labs[0].get("actuators", []):
+    for act in lab.get("actuators", []):
         payload = {"lab_id": lab_id, "actuator_id": act.get("actuator_id"), "action": action, "source": "bot"}
         res = _post("command", payload)
         if not res.get("ok"):
@@ -379,12 +394,10 @@ def send_menu(chat_id):
 
 
 def send_lab_controls(chat_id, lab_id):
-    status = _get("status")
-    labs = [l for l in status.get("labs", []) if l.get("lab_id") == lab_id]
-    if not labs:
+    lab = get_lab_status(lab_id)
+    if not lab:
         bot.sendMessage(chat_id, "Lab not found.")
         return
-    lab = labs[0]
     rows = []
     for act in lab.get("actuators", []):
         aid = act.get("actuator_id")
@@ -410,12 +423,11 @@ def send_lab_picker(chat_id, action, all_actuators=False):
 
 
 def send_actuator_picker(chat_id, lab_id, action):
-    status = _get("status")
-    labs = [l for l in status.get("labs", []) if l.get("lab_id") == lab_id]
-    if not labs:
+    lab = get_lab_status(lab_id)
+    if not lab:
         bot.sendMessage(chat_id, "Lab not found.")
         return
-    acts = labs[0].get("actuators", [])
+    acts = lab.get("actuators", [])
     if not acts:
         bot.sendMessage(chat_id, "No actuators in this lab.")
         return
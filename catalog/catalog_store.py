@@ -1,33 +1,219 @@
 # read and write JSON files with thread safety and timestamp management
+#
+# Catalog edits can also be appended to a per-file journal (<file>.journal, one
+# JSON op per line) instead of rewriting the whole document: read_json replays
+# the journal over the base file, and every CATALOG_COMPACT_EVERY entries (or on
+# write_json) the document is rewritten and the journal dropped. An op is always
+# in the journal before the rewrite that includes it, so a journal left behind
+# by a crash between rewrite and removal ends in the rewritten state; ops are
+# keyed "last writer wins" updates, so replaying it over that base is harmless.
+#
+# CATALOG_BACKEND=sqlite keeps the catalog documents in SQLite instead (see
+# sqlite_store); the functions below keep the same signatures either way.
 
 import json
+import logging
 import os
 import threading
 from datetime import datetime
 
-_FILE_LOCK = threading.Lock()
+from catalog import sqlite_store
+
+logger = logging.getLogger("CatalogStore")
+
+COMPACT_EVERY = int(os.getenv("CATALOG_COMPACT_EVERY", "500"))
+JOURNAL_FSYNC = os.getenv("CATALOG_JOURNAL_FSYNC", "1").lower() not in ("0", "false", "no")
+BACKEND = os.getenv("CATALOG_BACKEND", "json").lower()
+
+_LOCKS_GUARD = threading.Lock()
+_LOCKS = {}
+_JOURNAL_LEN = {}
 
 def _ts():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def _lock_for(path):
+    key = os.path.abspath(path)
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(key)
+        if lock is None:
+            lock = _LOCKS[key] = threading.RLock()
+        return lock
+
+def journal_path(path):
+    return path + ".journal"
+
+def _in_sqlite(path):
+    return BACKEND == "sqlite" and sqlite_store.handles(path)
+
+# ---------------------------------------------------------------------- journal ops
+def op_put(list_name, key, record):
+    """Insert or replace the record whose `key` field matches in data[list_name]."""
+    return {"op": "put", "list": list_name, "key": key, "value": record}
+
+def op_remove(list_name, key, record_id):
+    return {"op": "remove", "list": list_name, "key": key, "id": record_id}
+
+def op_set(path, value):
+    """Set a nested value, e.g. op_set(["per_lab", "lab1"], {...})."""
+    return {"op": "set", "path": list(path), "value": value}
+
+def op_unset(path):
+    return {"op": "unset", "path": list(path)}
+
+def _replay(data, entries):
+    tables = {}
+    for entry in entries:
+        op = entry.get("op")
+        if op in ("put", "remove"):
+            name, key = entry["list"], entry["key"]
+            table = tables.get(name)
+            if table is None:
+                table = tables[name] = {rec.get(key): rec for rec in data.get(name, [])}
+            if op == "put":
+                table[entry["value"][key]] = entry["value"]
+            else:
+                table.pop(entry["id"], None)
+        elif op in ("set", "unset"):
+            *parents, last = entry["path"]
+            node = data
+            for part in parents:
+                node = node.setdefault(part, {})
+            if op == "set":
+                node[last] = entry["value"]
+            else:
+                node.pop(last, None)
+    for name, table in tables.items():
+        data[name] = list(table.values())
+    return data
+
+def _read_journal(path):
+    try:
+        with open(journal_path(path), "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # a torn last line is what a crash mid-append leaves behind
+            logger.warning("Skipping unreadable journal line %s:%d", journal_path(path), n)
+    return entries
+
+def _end_torn_line(path):
+    """Terminate a partial last line so the next append starts on its own line."""
+    try:
+        with open(journal_path(path), "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+def _touch(data, touch_ts_keys):
+    """Refresh last_update timestamps; return them as set ops."""
+    touched = []
+    for k in touch_ts_keys or ():
+        if isinstance(data, dict) and k in data:
+            if isinstance(data[k], dict) and "last_update" in data[k]:
+                data[k]["last_update"] = _ts()
+                touched.append(op_set([k, "last_update"], data[k]["last_update"]))
+            if k == "last_update":
+                data["last_update"] = _ts()
+                touched.append(op_set(["last_update"], data["last_update"]))
+    return touched
+
+# ---------------------------------------------------------------------- files
 def read_json(path):
-    with _FILE_LOCK:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    """Load a catalog document with its journal (if any) applied."""
+    if _in_sqlite(path):
+        return sqlite_store.read_doc(path, _read_file)
+    return _read_file(path)
+
+def _read_file(path):
+    with _lock_for(path):
+        for _ in range(3):
+            before = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = _read_journal(path)
+            # a writer in another process may have compacted in between; read again
+            if os.stat(path).st_mtime_ns == before:
+                break
+        return _replay(data, entries) if entries else data
+
+def catalog_mtime(path):
+    """Latest modification time of a document or its journal (raises OSError if missing)."""
+    if _in_sqlite(path):
+        return sqlite_store.db_mtime()
+    mtime = os.path.getmtime(path)
+    try:
+        return max(mtime, os.path.getmtime(journal_path(path)))
+    except OSError:
+        return mtime
 
 def write_json(path, data, touch_ts_keys=None):
-    if touch_ts_keys:
-        for k in touch_ts_keys:
-            if isinstance(data, dict) and k in data:
-                if isinstance(data[k], dict) and "last_update" in data[k]:
-                    data[k]["last_update"] = _ts()
-                if k == "last_update":
-                    data["last_update"] = _ts()
-    with _FILE_LOCK:
+    """Rewrite the whole document and drop its journal.
+
+    `data` must already include every journaled op (as the registry's in-memory
+    documents do), otherwise a leftover journal could be replayed over it.
+    """
+    _touch(data, touch_ts_keys)
+    if _in_sqlite(path):
+        # the JSON file is still refreshed for tools that read it directly
+        sqlite_store.write_doc(path, data)
+    with _lock_for(path):
         tmp = path + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         os.replace(tmp, path)
+        # the document now holds everything the journal did
+        try:
+            os.remove(journal_path(path))
+        except FileNotFoundError:
+            pass
+        _JOURNAL_LEN[os.path.abspath(path)] = 0
+
+def append_journal(path, data, ops, touch_ts_keys=None):
+    """Persist ops already applied to `data` (the full in-memory document).
+
+    Appends (and fsyncs) one line per op; once the journal reaches
+    CATALOG_COMPACT_EVERY entries the document is then rewritten from `data`.
+    """
+    ops = list(ops) + _touch(data, touch_ts_keys)
+    if _in_sqlite(path):
+        sqlite_store.apply_ops(path, ops, _read_file)
+        return
+    key = os.path.abspath(path)
+    with _lock_for(path):
+        count = _JOURNAL_LEN.get(key)
+        if count is None:
+            count = len(_read_journal(path))
+            _end_torn_line(path)
+        with open(journal_path(path), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n" for op in ops))
+            f.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(f.fileno())
+        _JOURNAL_LEN[key] = count + len(ops)
+        # compact only once the ops are durable in the journal (see module comment)
+        if count + len(ops) >= COMPACT_EVERY:
+            write_json(path, data)
+
+def compact(path, data):
+    """Fold the journal into the document if there is one."""
+    if _in_sqlite(path):
+        return
+    with _lock_for(path):
+        if os.path.exists(journal_path(path)):
+            write_json(path, data)
 
 def bump_top_last_update(obj):
     if isinstance(obj, dict) and "last_update" in obj:
@@ -0,0 +1,205 @@
+# SQLite catalog backend, enabled with CATALOG_BACKEND=sqlite
+#
+# The labs/devices/thresholds/permissions documents live in one WAL-mode
+# database (CATALOG_DB), one table per record collection with an id primary key
+# and an index on lab_id, so other processes keep reading while the registry
+# writes and a batch of edits commits as one transaction. catalog_store routes
+# read_json / write_json / append_journal here for those documents, so callers
+# still get the same JSON-shaped dicts. A document not yet in the database is
+# imported from its JSON file on first use.
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("CatalogSqlite")
+
+DB_PATH = os.getenv("CATALOG_DB") or os.path.join(os.path.dirname(__file__), "catalog.db")
+
+# document -> {top-level key: (table, record id field, or None for an id -> value dict)}
+COLLECTIONS = {
+    "labs": {"labs": ("labs", "lab_id")},
+    "devices": {"sensors": ("sensors", "sensor_id"), "actuators": ("actuators", "actuator_id")},
+    "thresholds": {"per_lab": ("thresholds", None)},
+    "permissions": {"roles": ("permissions", None)},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (doc TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (doc TEXT, key TEXT, pos INTEGER, value TEXT, PRIMARY KEY (doc, key));
+""" + "".join(
+    f"""
+CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, lab_id TEXT, pos INTEGER NOT NULL, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS {table}_lab_id ON {table} (lab_id);
+"""
+    for cols in COLLECTIONS.values()
+    for table, _ in cols.values()
+)
+
+_local = threading.local()
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def doc_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def handles(path):
+    return doc_name(path) in COLLECTIONS
+
+def _conn():
+    # one connection per thread; sqlite3 connections are not shared across threads
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+@contextmanager
+def _transaction(write=True):
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def db_mtime():
+    """Latest change to the database (commits land in the -wal file first)."""
+    _conn()
+    mtime = os.path.getmtime(DB_PATH)
+    try:
+        return max(mtime, os.path.getmtime(DB_PATH + "-wal"))
+    except OSError:
+        return mtime
+
+# ---------------------------------------------------------------------- rows
+def _put_row(conn, table, row_id, lab_id, value):
+    conn.execute(
+        f"INSERT INTO {table} (id, lab_id, pos, data) VALUES (?, ?, (SELECT COALESCE(MAX(pos), 0) + 1 FROM {table}), ?)"
+        " ON CONFLICT (id) DO UPDATE SET lab_id = excluded.lab_id, data = excluded.data",
+        (row_id, lab_id, _dumps(value)),
+    )
+
+def _put_meta(conn, doc, key, value):
+    conn.execute(
+        "INSERT INTO meta (doc, key, pos, value) VALUES (?, ?, (SELECT COALESCE(MAX(pos), 0) + 1 FROM meta WHERE doc = ?), ?)"
+        " ON CONFLICT (doc, key) DO UPDATE SET value = excluded.value",
+        (doc, key, doc, _dumps(value)),
+    )
+
+def _fill_collection(conn, table, id_field, value):
+    conn.execute(f"DELETE FROM {table}")
+    if id_field is None:
+        for row_id, item in (value or {}).items():
+            _put_row(conn, table, row_id, None, item)
+    else:
+        for record in value or []:
+            _put_row(conn, table, record[id_field], record.get("lab_id"), record)
+
+def _replace(conn, doc, data):
+    cols = COLLECTIONS[doc]
+    conn.execute("DELETE FROM meta WHERE doc = ?", (doc,))
+    for key, value in data.items():
+        if key in cols:
+            _fill_collection(conn, *cols[key], value)
+        else:
+            _put_meta(conn, doc, key, value)
+    for key, (table, _) in cols.items():
+        if key not in data:
+            conn.execute(f"DELETE FROM {table}")
+
+def _ensure(doc, path, load_file):
+    conn = _conn()
+    if conn.execute("SELECT 1 FROM docs WHERE doc = ?", (doc,)).fetchone():
+        return
+    with _transaction() as conn:
+        if conn.execute("SELECT 1 FROM docs WHERE doc = ?", (doc,)).fetchone():
+            return
+        _replace(conn, doc, load_file(path))
+        conn.execute("INSERT INTO docs (doc) VALUES (?)", (doc,))
+    logger.info("Imported %s into %s", path, DB_PATH)
+
+# ---------------------------------------------------------------------- documents
+def read_doc(path, load_file):
+    doc = doc_name(path)
+    _ensure(doc, path, load_file)
+    with _transaction(write=False) as conn:
+        data = {
+            key: json.loads(value)
+            for key, value in conn.execute("SELECT key, value FROM meta WHERE doc = ? ORDER BY pos", (doc,))
+        }
+        for key, (table, id_field) in COLLECTIONS[doc].items():
+            rows = conn.execute(f"SELECT id, data FROM {table} ORDER BY pos").fetchall()
+            if id_field is None:
+                data[key] = {row_id: json.loads(value) for row_id, value in rows}
+            else:
+                data[key] = [json.loads(value) for _, value in rows]
+    return data
+
+def write_doc(path, data):
+    doc = doc_name(path)
+    with _transaction() as conn:
+        _replace(conn, doc, data)
+        conn.execute("INSERT OR IGNORE INTO docs (doc) VALUES (?)", (doc,))
+
+def _set_nested(obj, path, op, value):
+    *parents, last = path
+    for part in parents:
+        obj = obj.setdefault(part, {})
+    if op == "set":
+        obj[last] = value
+    else:
+        obj.pop(last, None)
+
+def apply_ops(path, ops, load_file):
+    """Apply catalog_store journal ops to the document in one transaction."""
+    doc = doc_name(path)
+    _ensure(doc, path, load_file)
+    cols = COLLECTIONS[doc]
+    with _transaction() as conn:
+        for entry in ops:
+            op = entry["op"]
+            if op in ("put", "remove"):
+                table, id_field = cols[entry["list"]]
+                if op == "put":
+                    record = entry["value"]
+                    _put_row(conn, table, record[id_field], record.get("lab_id"), record)
+                else:
+                    conn.execute(f"DELETE FROM {table} WHERE id = ?", (entry["id"],))
+                continue
+            key, *rest = entry["path"]
+            if key in cols:
+                table, id_field = cols[key]
+                if not rest:
+                    _fill_collection(conn, table, id_field, entry.get("value") if op == "set" else None)
+                    continue
+                if len(rest) == 1:
+                    if op == "set":
+                        _put_row(conn, table, rest[0], None, entry["value"])
+                    else:
+                        conn.execute(f"DELETE FROM {table} WHERE id = ?", (rest[0],))
+                    continue
+                row = conn.execute(f"SELECT data FROM {table} WHERE id = ?", (rest[0],)).fetchone()
+                value = json.loads(row[0]) if row else {}
+                _set_nested(value, rest[1:], op, entry.get("value"))
+                _put_row(conn, table, rest[0], value.get("lab_id") if id_field else None, value)
+                continue
+            if not rest:
+                if op == "set":
+                    _put_meta(conn, doc, key, entry["value"])
+                else:
+                    conn.execute("DELETE FROM meta WHERE doc = ? AND key = ?", (doc, key))
+                continue
+            row = conn.execute("SELECT value FROM meta WHERE doc = ? AND key = ?", (doc, key)).fetchone()
+            value = json.loads(row[0]) if row else {}
+            _set_nested(value, rest, op, entry.get("value"))
+            _put_meta(conn, doc, key, value)
@@ -0,0 +1,163 @@
+"""asyncio front end for the registry, enabled with REGISTRY_SERVER=asyncio.
+
+Serves the same REST surface as the CherryPy server from a single aiohttp event
+loop, so many idle or slow dashboard clients cost a coroutine each instead of a
+worker thread. Anything that may block - /status and /health (which go through
+the registry's ControllerClient, with its snapshot cache, single-flight fetch and
+circuit breaker, when the controller runs as a separate service) and catalog
+writes, which touch files and take the registry lock - runs on a small thread pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+try:
+    from aiohttp import web
+except ImportError:  # pragma: no cover - optional dependency
+    web = None
+
+from catalog_registry.status_cache import PreEncoded, Reply
+
+
+logger = logging.getLogger("RegistryAsync")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
+
+class AsyncRegistryServer:
+    """Route aiohttp requests to a RegistryAPI's framework-agnostic handlers."""
+
+    def __init__(self, api, blocking_workers: Optional[int] = None):
+        self.api = api
+        self.workers = blocking_workers or int(os.getenv("REGISTRY_BLOCKING_WORKERS", "4"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="registry_blocking")
+
+    # ------------------------------------------------------------------ app
+    def make_app(self) -> "web.Application":
+        app = web.Application()
+        app.router.add_get("/events", self._events)
+        app.router.add_get("/export", self._export)
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        app.on_startup.append(self._started)
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    async def _started(self, _app):
+        logger.info("Async registry ready blocking_workers=%s", self.workers)
+
+    async def _shutdown(self, _app):
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------ controller
+    async def _status(self, request: "web.Request") -> Reply:
+        # building/encoding the document (and a remote controller fetch) stays off the loop
+        return await self._blocking(self.api._status_reply, dict(request.query), request.headers)
+
+    async def _health(self) -> dict:
+        return await self._blocking(self.api._health_payload)
+
+    async def _events(self, request: "web.Request") -> "web.StreamResponse":
+        """Server-Sent Events stream of /status changes (see live_stream)."""
+        live = self.api.live
+        since = request.query.get("since") or request.headers.get("Last-Event-ID")
+        sub = await self._blocking(live.subscribe, since, asyncio.get_running_loop())
+        if sub is None:
+            return self._respond({"error": "too many live clients"}, status=503)
+        headers = {**CORS_HEADERS, "Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        resp = web.StreamResponse(headers=headers)
+        try:
+            await resp.prepare(request)
+            await resp.write(b"retry: 3000\n\n")
+            while True:
+                event = await sub.get(live.heartbeat_sec)
+                await resp.write(event if event is not None else b": keepalive\n\n")
+        except ConnectionResetError:
+            pass
+        finally:
+            live.unsubscribe(sub)
+        return resp
+
+    async def _export(self, request: "web.Request") -> "web.StreamResponse":
+        """NDJSON catalog export (see RegistryAPI.export_ndjson).
+
+        The snapshot is taken under the registry lock and each chunk is encoded
+        on the blocking pool, so a large catalog never stalls the event loop.
+        """
+        snapshot = await self._blocking(self.api.export_snapshot, request.query.get("lab_id"))
+        chunks = self.api.export_chunks(snapshot)
+        resp = web.StreamResponse(headers={**CORS_HEADERS, "Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        while True:
+            chunk = await self._blocking(next, chunks, None)
+            if chunk is None:
+                break
+            await resp.write(chunk)
+        await resp.write_eof()
+        return resp
+
+    # ------------------------------------------------------------------ requests
+    async def _blocking(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    @staticmethod
+    def _respond(payload: Any, status: int = 200) -> "web.Response":
+        headers = CORS_HEADERS
+        if isinstance(payload, Reply):
+            status, headers = payload.status, {**CORS_HEADERS, **payload.headers}
+            payload = payload.body
+        if status in (204, 304):
+            return web.Response(status=status, headers=headers)
+        if isinstance(payload, PreEncoded):
+            return web.Response(body=bytes(payload), status=status, content_type="application/json", headers=headers)
+        return web.json_response(payload, status=status, headers=headers)
+
+    async def _handle(self, request: "web.Request") -> "web.Response":
+        method = request.method
+        if method == "OPTIONS":
+            return self._respond(None, status=204)
+        uri = tuple(seg for seg in request.match_info["tail"].split("/") if seg)
+        path = uri[0].lower() if uri else ""
+        try:
+            if method == "GET":
+                if path == "status" and len(uri) == 1:
+                    result = await self._status(request)
+                elif path == "status":
+                    # a single lab may need a (blocking) controller fetch
+                    result = await self._blocking(self.api.handle_get, uri, dict(request.query))
+                elif path == "health":
+                    result = await self._health()
+                else:
+                    # everything else is an in-memory catalog read
+                    result = self.api.handle_get(uri, dict(request.query))
+            elif method in ("POST", "PUT"):
+                try:
+                    body = await request.json()
+                except ValueError:
+                    return self._respond({"error": "invalid JSON body"}, status=400)
+                handler = self.api.handle_post if method == "POST" else self.api.handle_put
+                result = await self._blocking(handler, uri, body)
+            elif method == "DELETE":
+                result = await self._blocking(self.api.handle_delete, uri)
+            else:
+                return self._respond({"error": "method not allowed"}, status=405)
+        except Exception as exc:
+            logger.exception("Request %s /%s failed: %s", method, "/".join(uri), exc)
+            return self._respond({"error": "internal error"}, status=500)
+        return self._respond(result)
+
+
+def run(api, host: str = "0.0.0.0", port: int = 8080):
+    if web is None:
+        raise RuntimeError("REGISTRY_SERVER=asyncio requires aiohttp (pip install -r requirements-optional.txt)")
+    server = AsyncRegistryServer(api)
+    web.run_app(server.make_app(), host=host, port=port, print=None)
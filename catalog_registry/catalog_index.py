@@ -0,0 +1,116 @@
+"""Hash indexes over the registry's catalog documents.
+
+The catalog stays the plain JSON documents that are persisted (``labs.json``,
+``devices.json``); CatalogIndex keeps id -> record and lab_id -> records maps
+pointing at the same dicts, so lookups, per-lab listings and the "lab still has
+devices" check on DELETE no longer scan the lists. Every mutation of the
+documents goes through the index so both stay in step.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Table:
+    """One list of records in a catalog document, indexed by id (and by lab_id)."""
+
+    def __init__(self, doc: dict, key: str, id_field: str, by_lab: bool = True):
+        self.doc = doc
+        self.key = key
+        self.id_field = id_field
+        self._by_id: Dict[str, dict] = {}
+        self._by_lab: Optional[Dict[str, Dict[str, dict]]] = {} if by_lab else None
+        for record in doc.setdefault(key, []):
+            self._index(record)
+
+    def _index(self, record: dict) -> None:
+        record_id = record[self.id_field]
+        self._by_id[record_id] = record
+        if self._by_lab is not None:
+            self._by_lab.setdefault(record["lab_id"], {})[record_id] = record
+
+    def _unindex(self, record: dict) -> None:
+        record_id = record[self.id_field]
+        self._by_id.pop(record_id, None)
+        if self._by_lab is not None:
+            members = self._by_lab.get(record["lab_id"])
+            if members is not None:
+                members.pop(record_id, None)
+                if not members:
+                    del self._by_lab[record["lab_id"]]
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, record_id: Any) -> bool:
+        return record_id in self._by_id
+
+    def get(self, record_id: str) -> Optional[dict]:
+        return self._by_id.get(record_id)
+
+    def in_lab(self, lab_id: str) -> List[dict]:
+        return list(self._by_lab.get(lab_id, {}).values())
+
+    def count_in_lab(self, lab_id: str) -> int:
+        return len(self._by_lab.get(lab_id, ()))
+
+    def labs(self) -> List[str]:
+        return list(self._by_lab)
+
+    def add(self, record: dict) -> dict:
+        self.doc.setdefault(self.key, []).append(record)
+        self._index(record)
+        return record
+
+    def update(self, record_id: str, patch: Dict[str, Any]) -> Optional[dict]:
+        """Apply patch to the record in place; None if unknown.
+
+        Only a lab_id change re-indexes the record (it then lists last in its new
+        lab); otherwise it keeps its position in in_lab().
+        """
+        record = self._by_id.get(record_id)
+        if record is None:
+            return None
+        if self._by_lab is None or patch.get("lab_id", record["lab_id"]) == record["lab_id"]:
+            record.update(patch)
+            return record
+        self._unindex(record)
+        record.update(patch)
+        self._index(record)
+        return record
+
+    def remove(self, record_id: str) -> Optional[dict]:
+        """Drop the record; None if unknown.
+
+        The index updates are O(1), but deleting from the persisted list is O(n)
+        (a search from the end, where recent additions are): the list order is
+        what gets saved, so it is not reordered with a swap-delete.
+        """
+        record = self._by_id.get(record_id)
+        if record is None:
+            return None
+        self._unindex(record)
+        records = self.doc[self.key]
+        # identity match: the list holds the very dict the index points at
+        for idx in range(len(records) - 1, -1, -1):
+            if records[idx] is record:
+                del records[idx]
+                break
+        return record
+
+
+class CatalogIndex:
+    """Indexed view of the labs and devices documents; see the module docstring."""
+
+    def __init__(self, labs_doc: dict, devices_doc: dict):
+        self.labs = _Table(labs_doc, "labs", "lab_id", by_lab=False)
+        self.sensors = _Table(devices_doc, "sensors", "sensor_id")
+        self.actuators = _Table(devices_doc, "actuators", "actuator_id")
+
+    def devices_of(self, lab_id: str) -> Tuple[List[dict], List[dict]]:
+        """(sensors, actuators) of a lab, in insertion order."""
+        return self.sensors.in_lab(lab_id), self.actuators.in_lab(lab_id)
+
+    def stats(self) -> dict:
+        return {"labs": len(self.labs), "sensors": len(self.sensors), "actuators": len(self.actuators)}
@@ -0,0 +1,193 @@
+"""Pooled HTTP client for the registry's calls to a separately running controller.
+
+One keep-alive requests.Session is shared by all registry threads. Snapshot
+fetches are cached for CONTROLLER_SNAPSHOT_TTL seconds and concurrent misses are
+coalesced into a single request (single-flight). After
+CONTROLLER_BREAKER_FAILURES consecutive failures a circuit breaker short-circuits
+calls for CONTROLLER_BREAKER_RESET_SEC, so a down controller costs nothing
+instead of a timeout per /status request.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from typing import Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger("ControllerClient")
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the controller while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = 5, reset_sec: float = 10.0):
+        self.max_failures = max(1, failures)
+        self.reset_sec = reset_sec
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    def allow(self) -> bool:
+        """True if a call may go out; while open, lets one trial call through per reset period."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_sec:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Controller reachable again, closing circuit")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.max_failures):
+                if self._opened_at is None:
+                    logger.warning("Controller failed %s times, opening circuit for %ss", self._failures, self.reset_sec)
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._trial else "open"
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+
+
+class ControllerClient:
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        snapshot_ttl: Optional[float] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        pool_size = pool_size or int(os.getenv("CONTROLLER_POOL_SIZE", "10"))
+        self.timeout: Tuple[float, float] = (
+            connect_timeout or float(os.getenv("CONTROLLER_CONNECT_TIMEOUT", "1")),
+            read_timeout or float(os.getenv("CONTROLLER_TIMEOUT", "2")),
+        )
+        self.snapshot_ttl = snapshot_ttl if snapshot_ttl is not None else float(os.getenv("CONTROLLER_SNAPSHOT_TTL", "0.5"))
+        self.breaker = CircuitBreaker(
+            failures=int(os.getenv("CONTROLLER_BREAKER_FAILURES", "5")),
+            reset_sec=float(os.getenv("CONTROLLER_BREAKER_RESET_SEC", "10")),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._snapshot: Optional[Tuple[float, dict]] = None
+        self._flight: Optional[_Flight] = None
+        self._flight_lock = threading.Lock()
+        self.fetches = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    # ------------------------------------------------------------------ requests
+    def get_json(self, path: str) -> Any:
+        """GET base_url/path and decode JSON; raises CircuitOpen or the request error."""
+        if not self.breaker.allow():
+            raise CircuitOpen(path)
+        try:
+            resp = self.session.get(f"{self.base_url}/{path.lstrip('/')}", timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception:
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        return data
+
+    def health(self) -> bool:
+        try:
+            self.get_json("health")
+            return True
+        except Exception:
+            return False
+
+    def snapshot(self) -> Optional[dict]:
+        """Controller /snapshot, served from the TTL cache or one shared in-flight fetch; None on failure."""
+        cached = self._snapshot
+        if cached is not None and time.monotonic() - cached[0] < self.snapshot_ttl:
+            self.cache_hits += 1
+            return cached[1]
+        with self._flight_lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait(sum(self.timeout) + 1)
+            return flight.result
+        try:
+            self.fetches += 1
+            data = self.get_json("snapshot")
+            if isinstance(data, dict):
+                self._snapshot = (time.monotonic(), data)
+                flight.result = data
+        except CircuitOpen:
+            pass
+        except Exception as exc:
+            logger.warning("Controller snapshot fetch failed: %s", exc)
+        finally:
+            with self._flight_lock:
+                self._flight = None
+            flight.done.set()
+        return flight.result
+
+    def lab_snapshot(self, lab_id: str) -> Optional[dict]:
+        """One lab's state: from a still-fresh full snapshot, else via /snapshot/{lab_id}."""
+        cached = self._snapshot
+        if cached is not None and time.monotonic() - cached[0] < self.snapshot_ttl:
+            self.cache_hits += 1
+            return cached[1].get(lab_id)
+        try:
+            data = self.get_json(f"snapshot/{urllib.parse.quote(lab_id, safe='')}")
+        except CircuitOpen:
+            return None
+        except Exception as exc:
+            logger.warning("Controller snapshot fetch for lab=%s failed: %s", lab_id, exc)
+            return None
+        if not isinstance(data, dict) or "error" in data:
+            return None
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "fetches": self.fetches,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+        }
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,216 @@
+"""Push /status changes to live clients as Server-Sent Events.
+
+One StatusBroadcaster per registry computes each change once (a /status delta,
+see status_cache) and fans the encoded event out to every subscriber, so adding
+a dashboard costs a buffer rather than another poller. With the embedded
+controller it wakes on state_memory change notifications; against a remote
+controller it re-checks the snapshot every LIVE_POLL_SEC. Bursts are debounced
+to one event per LIVE_MIN_INTERVAL_SEC.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, List, Optional
+
+from controller import state_memory as sm
+
+
+logger = logging.getLogger("StatusBroadcaster")
+
+
+def _ts() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sse(event_id: str, data: bytes) -> bytes:
+    return b"id: " + event_id.encode() + b"\nevent: status\ndata: " + data + b"\n\n"
+
+
+class _Subscriber:
+    """Bounded event buffer for a client served from a blocking worker thread."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._events: deque = deque()
+        self._cond = threading.Condition()
+
+    def push(self, event: bytes, full: bytes) -> None:
+        with self._cond:
+            if len(self._events) >= self.maxsize:
+                # too far behind: replace the backlog with one full document
+                self._events.clear()
+                event = full
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """Next event, or None after timeout (time for a keepalive)."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+
+class _AsyncSubscriber:
+    """Same as _Subscriber for a client served by an asyncio event loop."""
+
+    def __init__(self, maxsize: int, loop: asyncio.AbstractEventLoop):
+        self.maxsize = maxsize
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, event: bytes, full: bytes) -> None:
+        self._loop.call_soon_threadsafe(self._put, event, full)
+
+    def _put(self, event: bytes, full: bytes) -> None:
+        if self._queue.qsize() >= self.maxsize:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            event = full
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[bytes]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusBroadcaster:
+    def __init__(
+        self,
+        api,
+        poll_sec: Optional[float] = None,
+        min_interval_sec: Optional[float] = None,
+        heartbeat_sec: Optional[float] = None,
+        max_clients: Optional[int] = None,
+        queue_size: int = 32,
+    ):
+        self.api = api
+        self.poll_sec = poll_sec or float(os.getenv("LIVE_POLL_SEC", "2"))
+        self.min_interval_sec = min_interval_sec if min_interval_sec is not None else float(os.getenv("LIVE_MIN_INTERVAL_SEC", "0.5"))
+        self.heartbeat_sec = heartbeat_sec or float(os.getenv("LIVE_HEARTBEAT_SEC", "15"))
+        self.max_clients = max_clients or int(os.getenv("LIVE_MAX_CLIENTS", "500"))
+        self.queue_size = queue_size
+        self._subs: List[Any] = []
+        self._lock = threading.Lock()
+        # serialises publishing with subscribing so a new client never sees an older event after its first one
+        self._publish_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._version: Optional[int] = None
+        self.events_sent = 0
+
+    # ------------------------------------------------------------------ lifecycle
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="status_broadcaster", daemon=True)
+            self._thread.start()
+        if self.api.controller_enabled:
+            sm.add_listener(self._on_state_change)
+        logger.info("Live status stream started poll=%ss min_interval=%ss", self.poll_sec, self.min_interval_sec)
+
+    def stop(self):
+        sm.remove_listener(self._on_state_change)
+        self._stop.set()
+        self._dirty.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def notify(self) -> None:
+        """Ask for a publish round soon (state or catalog changed)."""
+        self._dirty.set()
+
+    def _on_state_change(self, _lab_id: str) -> None:
+        self._dirty.set()
+
+    # ------------------------------------------------------------------ subscribers
+    def subscribe(self, last_event_id: Optional[str] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Register a client and queue its first event; returns None when at capacity.
+
+        ``last_event_id`` (an SSE Last-Event-ID or ``?since=``) resumes with a delta
+        when that version is still known, else the client starts from a full document.
+        """
+        self.start()
+        sub = _AsyncSubscriber(self.queue_size, loop) if loop is not None else _Subscriber(self.queue_size)
+        with self._publish_lock:
+            with self._lock:
+                if len(self._subs) >= self.max_clients:
+                    return None
+                self._subs.append(sub)
+            cache = self.api._status_cache
+            doc = self.api._status_doc()
+            full = _sse(cache.tag(doc.version), cache.encode(doc, _ts()))
+            first = full
+            since = cache.parse_tag(last_event_id) if last_event_id else None
+            delta = cache.changes_since(since) if since is not None else None
+            if delta is not None:
+                version, labs, removed = delta
+                first = _sse(cache.tag(version), cache.encode_delta(version, since, labs, removed, _ts()))
+            if self._version is None:
+                self._version = doc.version
+            sub.push(first, full)
+        return sub
+
+    def unsubscribe(self, sub) -> None:
+        with self._lock:
+            try:
+                self._subs.remove(sub)
+            except ValueError:
+                pass
+
+    # ------------------------------------------------------------------ publishing
+    def _run(self):
+        while not self._stop.is_set():
+            self._dirty.wait(self.poll_sec)
+            self._dirty.clear()
+            if self._stop.is_set():
+                break
+            if self._subs:
+                try:
+                    self._publish()
+                except Exception as exc:
+                    logger.warning("Live status publish failed: %s", exc)
+            if self.min_interval_sec:
+                self._stop.wait(self.min_interval_sec)
+
+    def _publish(self):
+        with self._publish_lock:
+            cache = self.api._status_cache
+            doc = self.api._status_doc()
+            if doc.version == self._version:
+                return
+            ts = _ts()
+            full = _sse(cache.tag(doc.version), cache.encode(doc, ts))
+            delta = cache.changes_since(self._version) if self._version is not None else None
+            if delta is not None:
+                version, labs, removed = delta
+                event = _sse(cache.tag(version), cache.encode_delta(version, self._version, labs, removed, ts))
+            else:
+                version, event = doc.version, full
+            self._version = version
+            with self._lock:
+                subs = list(self._subs)
+            for sub in subs:
+                try:
+                    sub.push(event, full)
+                except RuntimeError:
+                    # the subscriber's event loop is gone
+                    self.unsubscribe(sub)
+            self.events_sent += len(subs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = len(self._subs)
+        return {"clients": clients, "events_sent": self.events_sent, "version": self._version}
@@ -5,15 +5,28 @@ from __future__ import annotations
 import os
 import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, Hashable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 import cherrypy
 import logging
-import requests
 
-from catalog.catalog_store import bump_top_last_update, read_json, write_json
+from catalog.catalog_store import (
+    append_journal,
+    compact,
+    op_put,
+    op_remove,
+    op_set,
+    op_unset,
+    read_json,
+    write_json,
+)
+from catalog_registry.catalog_index import CatalogIndex
+from catalog_registry.controller_client import ControllerClient
+from catalog_registry.live_stream import StatusBroadcaster
+from catalog_registry.status_cache import PreEncoded, Reply, StatusCache, StatusDoc
 from catalog_registry.validators import (
     validate_actuator,
+    validate_bulk,
     validate_command,
     validate_lab,
     validate_sensor,
@@ -22,7 +35,7 @@ from catalog_registry.validators import (
 from controller import state_memory as sm
 from controller.cu_instancer import DEFAULT_THRESHOLDS, get_manager
 from Device_connectors.mqtt_client import MqttClient
-from Device_connectors import actuator_bridge
+from Device_connectors import actuator_bridge, codec
 from logging_setup import configure_logging
 
 configure_logging()
@@ -33,6 +46,8 @@ LABS_PATH = os.path.join(CATALOG_DIR, "labs.json")
 DEVICES_PATH = os.path.join(CATALOG_DIR, "devices.json")
 THRESHOLDS_PATH = os.path.join(CATALOG_DIR, "thresholds.json")
 PERMISSIONS_PATH = os.path.join(CATALOG_DIR, "permissions.json")
+# records per chunk written to a streaming /export response
+EXPORT_CHUNK = 256
 CONTROLLER_URL = os.getenv("CONTROLLER_URL", "http://controller:8081")
 REGISTRY_ENABLE_CONTROLLER = os.getenv("REGISTRY_ENABLE_CONTROLLER", "1").lower() not in ("0", "false", "no")
 
@@ -41,6 +56,20 @@ def _ts() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def _json_out(*args, **kwargs):
+    """cherrypy json_out handler: applies Reply status/headers and sends PreEncoded bodies as-is."""
+    value = cherrypy.serving.request._json_inner_handler(*args, **kwargs)
+    if isinstance(value, Reply):
+        cherrypy.response.status = value.status
+        cherrypy.response.headers.update(value.headers)
+        if value.status == 304:
+            return b""
+        value = value.body
+    if isinstance(value, PreEncoded):
+        return bytes(value)
+    return cherrypy.lib.jsontools.json_encode(value)
+
+
 class RegistryAPI:
     exposed = True
 
@@ -49,6 +78,11 @@ class RegistryAPI:
         self._lock = threading.RLock()
         self.manager = None
         self._command_client: Optional[MqttClient] = None
+        self.controller: Optional[ControllerClient] = None
+        # bumped on every catalog save; keys the /status cache
+        self._catalog_version = 0
+        self._status_cache = StatusCache()
+        self.live = StatusBroadcaster(self)
         self._load_catalogs()
         self.controller_enabled = REGISTRY_ENABLE_CONTROLLER
         if self.controller_enabled:
@@ -58,6 +92,7 @@ class RegistryAPI:
             port = int(os.getenv("MQTT_PORT", "1884"))
             self._command_client = MqttClient(client_id="registry_publisher", host=host, port=port)
             self._command_client.connect()
+            self.controller = ControllerClient(CONTROLLER_URL)
             self.logger.info("Registry running without embedded controller; using controller at %s", CONTROLLER_URL)
 
     # ------------------------------------------------------------------ helpers
@@ -69,17 +104,31 @@ class RegistryAPI:
         self.devices.setdefault("sensors", [])
         self.devices.setdefault("actuators", [])
         self.thresholds.setdefault("per_lab", {})
-
-    def _save_labs(self):
-        write_json(LABS_PATH, self.labs)
-
-    def _save_devices(self):
-        write_json(DEVICES_PATH, self.devices, touch_ts_keys=["last_update"])
+        self.index = CatalogIndex(self.labs, self.devices)
+        self._catalog_version += 1
+        # start each run from compacted documents
+        compact(LABS_PATH, self.labs)
+        compact(DEVICES_PATH, self.devices)
+        compact(THRESHOLDS_PATH, self.thresholds)
+
+    def _catalog_changed(self):
+        self._catalog_version += 1
+        self.live.notify()
+
+    # catalog edits are journaled (see catalog_store): pass the ops describing the change
+    def _save_labs(self, *ops):
+        append_journal(LABS_PATH, self.labs, ops, touch_ts_keys=["last_update"])
+        self._catalog_changed()
+
+    def _save_devices(self, *ops):
+        append_journal(DEVICES_PATH, self.devices, ops, touch_ts_keys=["last_update"])
+        self._catalog_changed()
         if self.manager:
             self.manager.reload_devices()
 
-    def _save_thresholds(self):
-        write_json(THRESHOLDS_PATH, self.thresholds, touch_ts_keys=["last_update"])
+    def _save_thresholds(self, *ops):
+        append_journal(THRESHOLDS_PATH, self.thresholds, ops, touch_ts_keys=["last_update"])
+        self._catalog_changed()
 
     def _save_permissions(self):
         write_json(PERMISSIONS_PATH, self.permissions, touch_ts_keys=["last_update"])
@@ -100,87 +149,246 @@ class RegistryAPI:
         per_lab = self.thresholds.setdefault("per_lab", {})
         if lab_id not in per_lab:
             per_lab[lab_id] = dict(self._default_thresholds())
-            self._save_thresholds()
+            self._save_thresholds(op_set(["per_lab", lab_id], per_lab[lab_id]))
 
     def _find_lab(self, lab_id: str) -> Optional[dict]:
-        return next((lab for lab in self.labs.get("labs", []) if lab["lab_id"] == lab_id), None)
-
-    def _sensor_index(self, sensor_id: str) -> Optional[int]:
-        for idx, sensor in enumerate(self.devices.get("sensors", [])):
-            if sensor["sensor_id"] == sensor_id:
-                return idx
-        return None
-
-    def _actuator_index(self, actuator_id: str) -> Optional[int]:
-        for idx, actuator in enumerate(self.devices.get("actuators", [])):
-            if actuator["actuator_id"] == actuator_id:
-                return idx
-        return None
+        return self.index.labs.get(lab_id)
 
     def _controller_snapshot(self) -> Optional[dict]:
-        try:
-            resp = requests.get(f"{CONTROLLER_URL.rstrip('/')}/snapshot", timeout=2)
-            resp.raise_for_status()
-            data = resp.json()
-            if isinstance(data, dict):
-                return data
-        except Exception as exc:
-            self.logger.warning("Controller snapshot fetch failed: %s", exc)
-        return None
-
-    def _status_payload(self) -> dict:
-        if self.controller_enabled:
+        return self.controller.snapshot() if self.controller else None
+
+    def _build_lab_status(self, lab: dict, lab_snapshot: dict, sensors: Sequence[dict], actuators: Sequence[dict]) -> dict:
+        lab_id = lab["lab_id"]
+        readings = lab_snapshot.get("sensors", {})
+        lab_sensors = [
+            {
+                "sensor_id": sensor["sensor_id"],
+                "type": sensor.get("type"),
+                "lab_id": lab_id,
+                "reading": readings.get(sensor["sensor_id"]) or {},
+            }
+            for sensor in sensors
+        ]
+        states = lab_snapshot.get("actuators", {})
+        lab_actuators = [
+            {
+                "actuator_id": actuator["actuator_id"],
+                "type": actuator.get("type"),
+                "lab_id": lab_id,
+                "state": states.get(actuator["actuator_id"]) or {},
+            }
+            for actuator in actuators
+        ]
+        return {
+            "lab_id": lab_id,
+            "name": lab.get("name", ""),
+            "notes": lab.get("notes", ""),
+            "thresholds": lab_snapshot.get("thresholds", self._threshold_for_lab(lab_id)),
+            "sensors": lab_sensors,
+            "actuators": lab_actuators,
+            "alerts": lab_snapshot.get("alerts", {}),
+            "last_sensor_seen": lab_snapshot.get("last_sensor_seen"),
+        }
+
+    def _build_status_labs(self, snapshot: dict) -> List[dict]:
+        return [
+            self._build_lab_status(lab, snapshot.get(lab["lab_id"], {}), *self.index.devices_of(lab["lab_id"]))
+            for lab in self.labs.get("labs", [])
+        ]
+
+    def _lab_status(self, lab_id: str) -> Optional[dict]:
+        """Status entry of a single lab, fetching only that lab's state from a remote controller."""
+        lab = self._find_lab(lab_id)
+        if lab is None:
+            return None
+        view = None
+        if not self.controller_enabled and self.controller:
+            view = self.controller.lab_snapshot(lab_id)
+        if view is None:
+            view = sm.get_lab(lab_id)
+        return self._build_lab_status(lab, view, *self.index.devices_of(lab_id))
+
+    def _status_doc(self, snapshot: Optional[dict] = None) -> StatusDoc:
+        """Return the cached per-lab status document.
+
+        ``snapshot`` lets async callers pass a controller snapshot they fetched
+        themselves. The cache key is the catalog version plus the state version:
+        the fleet generation for the in-process snapshot, or the per-lab view
+        versions of a remote one.
+        """
+        if snapshot is None and not self.controller_enabled:
+            snapshot = self._controller_snapshot()
+        state_key: Optional[Hashable]
+        if snapshot is None:
+            state_key = sm.get_version()
             snapshot = sm.get_snapshot()
         else:
-            snapshot = self._controller_snapshot() or sm.get_snapshot()
-        labs_payload: List[dict] = []
-        for lab in self.labs.get("labs", []):
-            lab_id = lab["lab_id"]
-            lab_snapshot = snapshot.get(lab_id, {})
-            lab_sensors = []
-            for sensor in [s for s in self.devices.get("sensors", []) if s["lab_id"] == lab_id]:
-                reading = lab_snapshot.get("sensors", {}).get(sensor["sensor_id"], {})
-                lab_sensors.append(
-                    {
-                        "sensor_id": sensor["sensor_id"],
-                        "type": sensor.get("type"),
-                        "lab_id": lab_id,
-                        "reading": reading or {},
-                    }
-                )
-            lab_actuators = []
-            for actuator in [a for a in self.devices.get("actuators", []) if a["lab_id"] == lab_id]:
-                state = lab_snapshot.get("actuators", {}).get(actuator["actuator_id"], {})
-                lab_actuators.append(
-                    {
-                        "actuator_id": actuator["actuator_id"],
-                        "type": actuator.get("type"),
-                        "lab_id": lab_id,
-                        "state": state or {},
-                    }
-                )
-            labs_payload.append(
-                {
-                    "lab_id": lab_id,
-                    "name": lab.get("name", ""),
-                    "notes": lab.get("notes", ""),
-                    "thresholds": lab_snapshot.get("thresholds", self._threshold_for_lab(lab_id)),
-                    "sensors": lab_sensors,
-                    "actuators": lab_actuators,
-                    "alerts": lab_snapshot.get("alerts", {}),
-                    "last_sensor_seen": lab_snapshot.get("last_sensor_seen"),
-                }
-            )
-        return {"labs": labs_payload, "ts": _ts()}
+            state_key = tuple((lab_id, view.get("version")) for lab_id, view in snapshot.items())
+            if any(version is None for _, version in state_key):
+                state_key = None
+        key = (self._catalog_version, state_key) if state_key is not None else None
+        return self._status_cache.current(key, lambda: self._build_status_labs(snapshot))
+
+    def _status_payload(self, snapshot: Optional[dict] = None) -> dict:
+        doc = self._status_doc(snapshot)
+        return {"labs": doc.labs, "version": self._status_cache.tag(doc.version), "ts": _ts()}
+
+    def _status_reply(
+        self,
+        params: Dict[str, Any],
+        headers: Mapping[str, str],
+        snapshot: Optional[dict] = None,
+    ) -> Reply:
+        """/status as pre-serialized JSON with an ETag.
+
+        A matching If-None-Match yields 304. ``?since=<version>`` (a previous
+        response's ``version``) returns only labs whose entry changed after it plus
+        the ids of removed labs; an unknown or expired version gets the full document.
+        """
+        cache = self._status_cache
+        doc = self._status_doc(snapshot)
+        etag = f'"{cache.tag(doc.version)}"'
+        reply_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if cache.matches(headers.get("If-None-Match"), doc.version):
+            return Reply(None, 304, reply_headers)
+        since = cache.parse_tag(params["since"]) if params.get("since") else None
+        if since is not None:
+            delta = cache.changes_since(since)
+            if delta is not None:
+                version, labs, removed = delta
+                reply_headers["ETag"] = f'"{cache.tag(version)}"'
+                return Reply(cache.encode_delta(version, since, labs, removed, _ts()), 200, reply_headers)
+        return Reply(cache.encode(doc, _ts()), 200, reply_headers)
+
+    def _health_payload(self, controller_ok: Optional[bool] = None) -> dict:
+        info = {"ok": True, "ts": _ts()}
+        if not self.controller_enabled:
+            if controller_ok is None:
+                controller_ok = self.controller.health() if self.controller else False
+            info["controller_ok"] = controller_ok
+        return info
+
+    def _apply_bulk(self, body: dict) -> dict:
+        """POST /bulk: check the whole batch against the catalog, then apply it with one save per file.
+
+        Records whose id already exists are replaced, so re-running an import is
+        harmless. Nothing is changed if any entry is rejected.
+        """
+        labs, sensors, actuators = body.get("labs", []), body.get("sensors", []), body.get("actuators", [])
+        patches = body.get("thresholds", {})
+        if isinstance(patches, list):
+            # the /export line form
+            patches = {entry["lab_id"]: entry["thresholds"] for entry in patches}
+        with self._lock:
+            batch_labs = {lab["lab_id"] for lab in labs}
+            for section, items in (("sensors", sensors), ("actuators", actuators)):
+                for i, item in enumerate(items):
+                    if item["lab_id"] not in batch_labs and item["lab_id"] not in self.index.labs:
+                        return {"error": f"{section}[{i}]: lab_id does not exist"}
+            for lab_id in patches:
+                if lab_id not in batch_labs and lab_id not in self.index.labs:
+                    return {"error": f"thresholds[{lab_id}]: lab does not exist"}
+
+            lab_ops, device_ops = [], []
+            new_labs = []
+            for item in labs:
+                record = {"lab_id": item["lab_id"], "name": item["name"], "notes": item.get("notes", "")}
+                if record["lab_id"] in self.index.labs:
+                    record = self.index.labs.update(record["lab_id"], record)
+                else:
+                    self.index.labs.add(record)
+                    new_labs.append(record["lab_id"])
+                lab_ops.append(op_put("labs", "lab_id", record))
+            for items, table, id_key in (
+                (sensors, self.index.sensors, "sensor_id"),
+                (actuators, self.index.actuators, "actuator_id"),
+            ):
+                for item in items:
+                    record = {id_key: item[id_key], "lab_id": item["lab_id"], "type": item["type"]}
+                    if record[id_key] in table:
+                        record = table.update(record[id_key], record)
+                    else:
+                        table.add(record)
+                    device_ops.append(op_put(table.key, id_key, record))
+            per_lab = self.thresholds.setdefault("per_lab", {})
+            touched = [lab_id for lab_id in new_labs if lab_id not in per_lab]
+            for lab_id in touched:
+                per_lab[lab_id] = dict(self._default_thresholds())
+            for lab_id, patch in patches.items():
+                per_lab.setdefault(lab_id, dict(self._default_thresholds())).update(patch)
+                touched.append(lab_id)
+            touched = list(dict.fromkeys(touched))
+
+            if lab_ops:
+                self._save_labs(*lab_ops)
+            if device_ops:
+                self._save_devices(*device_ops)
+            if touched:
+                self._save_thresholds(*(op_set(["per_lab", lab_id], per_lab[lab_id]) for lab_id in touched))
+            merged = {lab_id: self._threshold_for_lab(lab_id) for lab_id in set(new_labs) | set(patches)}
+        if self.controller_enabled and self.manager:
+            for lab_id in new_labs:
+                self.manager.ensure_lab(lab_id, merged[lab_id])
+            for lab_id in patches:
+                if lab_id not in new_labs:
+                    self.manager.update_thresholds(lab_id, merged[lab_id])
+        counts = {"labs": len(labs), "sensors": len(sensors), "actuators": len(actuators), "thresholds": len(patches)}
+        self.logger.info("Bulk import applied %s", counts)
+        return {"ok": True, "msg": "bulk applied", "applied": counts}
+
+    def export_snapshot(self, lab_id: Optional[str] = None) -> List[Tuple[str, List[dict]]]:
+        """Copy the records /export streams, under the registry lock so /bulk can't interleave."""
+        with self._lock:
+            if lab_id:
+                lab = self._find_lab(lab_id)
+                labs = [lab] if lab else []
+                sensors, actuators = self.index.devices_of(lab_id) if lab else ([], [])
+            else:
+                labs = self.labs.get("labs", [])
+                sensors = self.devices.get("sensors", [])
+                actuators = self.devices.get("actuators", [])
+            per_lab = self.thresholds.get("per_lab", {})
+            return [
+                ("labs", [dict(lab) for lab in labs]),
+                ("sensors", [dict(sensor) for sensor in sensors]),
+                ("actuators", [dict(actuator) for actuator in actuators]),
+                (
+                    "thresholds",
+                    [
+                        {"lab_id": lab["lab_id"], "thresholds": dict(per_lab[lab["lab_id"]])}
+                        for lab in labs
+                        if lab["lab_id"] in per_lab
+                    ],
+                ),
+            ]
+
+    @staticmethod
+    def export_chunks(snapshot: List[Tuple[str, List[dict]]]) -> Iterator[bytes]:
+        """Encode an export_snapshot as NDJSON, EXPORT_CHUNK lines at a time."""
+        lines: List[bytes] = []
+        for kind, records in snapshot:
+            for record in records:
+                lines.append(codec.dumps({"kind": kind, **record}))
+                if len(lines) >= EXPORT_CHUNK:
+                    yield b"\n".join(lines) + b"\n"
+                    lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+    def export_ndjson(self, lab_id: Optional[str] = None) -> Iterator[bytes]:
+        """Catalog as NDJSON chunks, one {"kind": <bulk section>, ...record} per line.
+
+        Grouping the lines by kind (without the "kind" key) gives a valid POST
+        /bulk body; thresholds come out in the {lab_id, thresholds} list form
+        that /bulk accepts alongside its lab_id -> patch object.
+        """
+        return self.export_chunks(self.export_snapshot(lab_id))
 
     # ------------------------------------------------------------------ handlers
-    @cherrypy.tools.json_out()
-    def OPTIONS(self, *uri, **params):
-        cherrypy.response.status = 204
-        return {}
-
-    @cherrypy.tools.json_out()
-    def GET(self, *uri, **params):
+    # Framework-agnostic: path segments plus query params / decoded JSON body in, a
+    # JSON-serialisable result out. The CherryPy methods at the bottom of the class
+    # and catalog_registry.async_server both dispatch here.
+    def handle_get(self, uri: Sequence[str], params: Dict[str, Any], headers: Optional[Mapping[str, str]] = None) -> Any:
         if not uri:
             return {
                 "ok": True,
@@ -196,20 +404,16 @@ class RegistryAPI:
                     "/threshold/{lab_id}",
                     "/permissions",
                     "/status",
+                    "/status/{lab_id}",
+                    "/events",
+                    "/export",
                 ],
             }
 
         path = uri[0].lower()
 
         if path == "health":
-            info = {"ok": True, "ts": _ts()}
-            if not self.controller_enabled:
-                try:
-                    r = requests.get(f"{CONTROLLER_URL.rstrip('/')}/health", timeout=2)
-                    info["controller_ok"] = r.ok
-                except Exception:
-                    info["controller_ok"] = False
-            return info
+            return self._health_payload()
 
         if path == "labs":
             return self.labs
@@ -222,29 +426,21 @@ class RegistryAPI:
 
         if path == "sensors":
             lab_filter = params.get("lab_id")
-            sensors = self.devices.get("sensors", [])
-            if lab_filter:
-                sensors = [s for s in sensors if s["lab_id"] == lab_filter]
-            return sensors
+            return self.index.sensors.in_lab(lab_filter) if lab_filter else self.devices.get("sensors", [])
 
         if path == "sensor":
             if len(uri) < 2:
                 return {"error": "sensor_id missing"}
-            idx = self._sensor_index(uri[1])
-            return self.devices["sensors"][idx] if idx is not None else {"error": "not found"}
+            return self.index.sensors.get(uri[1]) or {"error": "not found"}
 
         if path == "actuators":
             lab_filter = params.get("lab_id")
-            actuators = self.devices.get("actuators", [])
-            if lab_filter:
-                actuators = [a for a in actuators if a["lab_id"] == lab_filter]
-            return actuators
+            return self.index.actuators.in_lab(lab_filter) if lab_filter else self.devices.get("actuators", [])
 
         if path == "actuator":
             if len(uri) < 2:
                 return {"error": "actuator_id missing"}
-            idx = self._actuator_index(uri[1])
-            return self.devices["actuators"][idx] if idx is not None else {"error": "not found"}
+            return self.index.actuators.get(uri[1]) or {"error": "not found"}
 
         if path == "thresholds":
             return self.thresholds
@@ -261,18 +457,17 @@ class RegistryAPI:
             return self.permissions
 
         if path == "status":
-            return self._status_payload()
+            if len(uri) > 1:
+                return self._lab_status(uri[1]) or {"error": f"lab '{uri[1]}' not found"}
+            return self._status_reply(params, headers or {})
 
         return {"error": "invalid endpoint"}
 
-    @cherrypy.tools.json_in()
-    @cherrypy.tools.json_out()
-    def POST(self, *uri, **_params):
+    def handle_post(self, uri: Sequence[str], body: Any) -> Any:
         if not uri:
-            return {"error": "use /labs, /sensors, /actuators, or /command"}
+            return {"error": "use /labs, /sensors, /actuators, /bulk, or /command"}
 
         path = uri[0].lower()
-        body = cherrypy.request.json
 
         if path == "labs":
             err = validate_lab(body)
@@ -281,11 +476,8 @@ class RegistryAPI:
             with self._lock:
                 if self._find_lab(body["lab_id"]):
                     return {"error": "lab_id already exists"}
-                self.labs.setdefault("labs", []).append(
-                    {"lab_id": body["lab_id"], "name": body["name"], "notes": body.get("notes", "")}
-                )
-                self.labs["last_update"] = _ts()
-                self._save_labs()
+                lab = self.index.labs.add({"lab_id": body["lab_id"], "name": body["name"], "notes": body.get("notes", "")})
+                self._save_labs(op_put("labs", "lab_id", lab))
                 self._ensure_threshold_entry(body["lab_id"])
             self.logger.info("Lab created %s", body["lab_id"])
             if self.controller_enabled and self.manager:
@@ -299,13 +491,12 @@ class RegistryAPI:
             with self._lock:
                 if not self._find_lab(body["lab_id"]):
                     return {"error": "lab_id does not exist"}
-                if self._sensor_index(body["sensor_id"]) is not None:
+                if body["sensor_id"] in self.index.sensors:
                     return {"error": "sensor_id already exists"}
-                self.devices.setdefault("sensors", []).append(
+                sensor = self.index.sensors.add(
                     {"sensor_id": body["sensor_id"], "lab_id": body["lab_id"], "type": body["type"]}
                 )
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                self._save_devices(op_put("sensors", "sensor_id", sensor))
             self.logger.info("Sensor created %s lab=%s", body["sensor_id"], body["lab_id"])
             return {"ok": True, "msg": "sensor created"}
 
@@ -316,16 +507,21 @@ class RegistryAPI:
             with self._lock:
                 if not self._find_lab(body["lab_id"]):
                     return {"error": "lab_id does not exist"}
-                if self._actuator_index(body["actuator_id"]) is not None:
+                if body["actuator_id"] in self.index.actuators:
                     return {"error": "actuator_id already exists"}
-                self.devices.setdefault("actuators", []).append(
+                actuator = self.index.actuators.add(
                     {"actuator_id": body["actuator_id"], "lab_id": body["lab_id"], "type": body["type"]}
                 )
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                self._save_devices(op_put("actuators", "actuator_id", actuator))
             self.logger.info("Actuator created %s lab=%s type=%s", body["actuator_id"], body["lab_id"], body["type"])
             return {"ok": True, "msg": "actuator created"}
 
+        if path == "bulk":
+            err = validate_bulk(body)
+            if err:
+                return {"error": err}
+            return self._apply_bulk(body)
+
         if path == "command":
             err = validate_command(body)
             if err:
@@ -334,10 +530,9 @@ class RegistryAPI:
             if not self._find_lab(lab_id):
                 return {"error": "lab not found"}
             with self._lock:
-                idx = self._actuator_index(body["actuator_id"])
-                if idx is None:
+                actuator = self.index.actuators.get(body["actuator_id"])
+                if actuator is None:
                     return {"error": "actuator_id not found"}
-                actuator = self.devices["actuators"][idx]
                 if actuator["lab_id"] != lab_id:
                     return {"error": "actuator not in specified lab"}
             if self.controller_enabled and self.manager:
@@ -366,16 +561,13 @@ class RegistryAPI:
 
         return {"error": "invalid endpoint"}
 
-    @cherrypy.tools.json_in()
-    @cherrypy.tools.json_out()
-    def PUT(self, *uri, **_params):
+    def handle_put(self, uri: Sequence[str], body: Any) -> Any:
         if not uri:
             return {
                 "error": "use /lab/{id}, /sensor/{id}, /actuator/{id}, /threshold/{lab_id}, or /permissions",
             }
 
         path = uri[0].lower()
-        body = cherrypy.request.json
 
         if path == "lab":
             if len(uri) < 2:
@@ -389,8 +581,7 @@ class RegistryAPI:
                     lab["name"] = body["name"]
                 if "notes" in body:
                     lab["notes"] = body["notes"]
-                self.labs["last_update"] = _ts()
-                self._save_labs()
+                self._save_labs(op_put("labs", "lab_id", lab))
             return {"ok": True, "msg": "lab updated"}
 
         if path == "sensor":
@@ -398,8 +589,7 @@ class RegistryAPI:
                 return {"error": "sensor_id missing"}
             sensor_id = uri[1]
             with self._lock:
-                idx = self._sensor_index(sensor_id)
-                if idx is None:
+                if sensor_id not in self.index.sensors:
                     return {"error": "sensor not found"}
                 patch = {}
                 if "lab_id" in body:
@@ -408,9 +598,8 @@ class RegistryAPI:
                     patch["lab_id"] = body["lab_id"]
                 if "type" in body:
                     patch["type"] = body["type"]
-                self.devices["sensors"][idx].update(patch)
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                sensor = self.index.sensors.update(sensor_id, patch)
+                self._save_devices(op_put("sensors", "sensor_id", sensor))
             return {"ok": True, "msg": "sensor updated"}
 
         if path == "actuator":
@@ -418,8 +607,7 @@ class RegistryAPI:
                 return {"error": "actuator_id missing"}
             actuator_id = uri[1]
             with self._lock:
-                idx = self._actuator_index(actuator_id)
-                if idx is None:
+                if actuator_id not in self.index.actuators:
                     return {"error": "actuator not found"}
                 patch = {}
                 if "lab_id" in body:
@@ -430,9 +618,8 @@ class RegistryAPI:
                     if body["type"] not in ("fan", "humidifier", "dehumidifier", "heater"):
                         return {"error": "invalid actuator type"}
                     patch["type"] = body["type"]
-                self.devices["actuators"][idx].update(patch)
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                actuator = self.index.actuators.update(actuator_id, patch)
+                self._save_devices(op_put("actuators", "actuator_id", actuator))
             return {"ok": True, "msg": "actuator updated"}
 
         if path == "threshold":
@@ -447,7 +634,7 @@ class RegistryAPI:
             with self._lock:
                 entry = self.thresholds.setdefault("per_lab", {}).setdefault(lab_id, {})
                 entry.update(body)
-                self._save_thresholds()
+                self._save_thresholds(op_set(["per_lab", lab_id], entry))
                 merged = self._threshold_for_lab(lab_id)
             if self.controller_enabled and self.manager:
                 self.manager.update_thresholds(lab_id, merged)
@@ -465,8 +652,7 @@ class RegistryAPI:
 
         return {"error": "invalid endpoint"}
 
-    @cherrypy.tools.json_out()
-    def DELETE(self, *uri, **_params):
+    def handle_delete(self, uri: Sequence[str]) -> Any:
         if not uri:
             return {"error": "use /lab/{id}, /sensor/{id}, or /actuator/{id}"}
 
@@ -477,19 +663,16 @@ class RegistryAPI:
                 return {"error": "lab_id missing"}
             lab_id = uri[1]
             with self._lock:
-                if any(s["lab_id"] == lab_id for s in self.devices.get("sensors", [])):
+                if self.index.sensors.count_in_lab(lab_id):
                     return {"error": "remove or move sensors first"}
-                if any(a["lab_id"] == lab_id for a in self.devices.get("actuators", [])):
+                if self.index.actuators.count_in_lab(lab_id):
                     return {"error": "remove or move actuators first"}
-                before = len(self.labs.get("labs", []))
-                self.labs["labs"] = [lab for lab in self.labs.get("labs", []) if lab["lab_id"] != lab_id]
-                if len(self.labs["labs"]) == before:
+                if self.index.labs.remove(lab_id) is None:
                     return {"error": "lab not found"}
-                self.labs["last_update"] = _ts()
-                self._save_labs()
+                self._save_labs(op_remove("labs", "lab_id", lab_id))
                 removed = self.thresholds.get("per_lab", {}).pop(lab_id, None)
                 if removed is not None:
-                    self._save_thresholds()
+                    self._save_thresholds(op_unset(["per_lab", lab_id]))
             self.logger.info("Lab deleted %s", lab_id)
             if self.controller_enabled and self.manager:
                 self.manager.remove_lab(lab_id)
@@ -500,12 +683,9 @@ class RegistryAPI:
                 return {"error": "sensor_id missing"}
             sensor_id = uri[1]
             with self._lock:
-                idx = self._sensor_index(sensor_id)
-                if idx is None:
+                if self.index.sensors.remove(sensor_id) is None:
                     return {"error": "sensor not found"}
-                self.devices["sensors"].pop(idx)
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                self._save_devices(op_remove("sensors", "sensor_id", sensor_id))
             self.logger.info("Sensor deleted %s", sensor_id)
             return {"ok": True, "msg": "sensor deleted"}
 
@@ -514,25 +694,103 @@ class RegistryAPI:
                 return {"error": "actuator_id missing"}
             actuator_id = uri[1]
             with self._lock:
-                idx = self._actuator_index(actuator_id)
-                if idx is None:
+                if self.index.actuators.remove(actuator_id) is None:
                     return {"error": "actuator not found"}
-                self.devices["actuators"].pop(idx)
-                bump_top_last_update(self.devices)
-                self._save_devices()
+                self._save_devices(op_remove("actuators", "actuator_id", actuator_id))
             self.logger.info("Actuator deleted %s", actuator_id)
             return {"ok": True, "msg": "actuator deleted"}
 
         return {"error": "invalid endpoint"}
 
+    # ------------------------------------------------------------------ CherryPy adapter
+    @cherrypy.tools.json_out()
+    def OPTIONS(self, *uri, **params):
+        cherrypy.response.status = 204
+        return {}
+
+    @cherrypy.tools.json_out(handler=_json_out)
+    def GET(self, *uri, **params):
+        return self.handle_get(uri, params, cherrypy.request.headers)
+
+    @cherrypy.tools.json_in()
+    @cherrypy.tools.json_out()
+    def POST(self, *uri, **_params):
+        return self.handle_post(uri, cherrypy.request.json)
+
+    @cherrypy.tools.json_in()
+    @cherrypy.tools.json_out()
+    def PUT(self, *uri, **_params):
+        return self.handle_put(uri, cherrypy.request.json)
+
+    @cherrypy.tools.json_out()
+    def DELETE(self, *uri, **_params):
+        return self.handle_delete(uri)
+
+
+class LiveEventsAPI:
+    """GET /events: Server-Sent Events stream of /status changes.
+
+    Each open stream holds one CherryPy worker thread, so run() caps live
+    clients at half the thread pool; past that clients get 503 and fall back to
+    polling /status. REGISTRY_SERVER=asyncio serves the same stream from the
+    event loop instead.
+    """
+
+    exposed = True
+    _cp_config = {"response.stream": True}
+
+    def __init__(self, live: StatusBroadcaster):
+        self.live = live
+
+    def GET(self, *_uri, **params):
+        sub = self.live.subscribe(params.get("since") or cherrypy.request.headers.get("Last-Event-ID"))
+        if sub is None:
+            cherrypy.response.status = 503
+            return b"too many live clients"
+        cherrypy.response.headers["Content-Type"] = "text/event-stream"
+        cherrypy.response.headers["Cache-Control"] = "no-cache"
+        cherrypy.response.headers["X-Accel-Buffering"] = "no"
+
+        def stream():
+            try:
+                yield b"retry: 3000\n\n"
+                while True:
+                    event = sub.get(self.live.heartbeat_sec)
+                    yield event if event is not None else b": keepalive\n\n"
+            finally:
+                self.live.unsubscribe(sub)
+
+        return stream()
+
+
+class CatalogExportAPI:
+    """GET /export[?lab_id=]: the catalog streamed as NDJSON (see RegistryAPI.export_ndjson)."""
+
+    exposed = True
+    _cp_config = {"response.stream": True}
+
+    def __init__(self, api: RegistryAPI):
+        self.api = api
+
+    def GET(self, *_uri, **params):
+        cherrypy.response.headers["Content-Type"] = "application/x-ndjson"
+        return self.api.export_ndjson(params.get("lab_id"))
+
 
 def run():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if os.getenv("REGISTRY_SERVER", "cherrypy").lower() == "asyncio":
+        from catalog_registry import async_server
+
+        async_server.run(RegistryAPI())
+        return
     def _cors():
         cherrypy.response.headers["Access-Control-Allow-Origin"] = "*"
         cherrypy.response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        cherrypy.response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        cherrypy.response.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match"
+        cherrypy.response.headers["Access-Control-Expose-Headers"] = "ETag"
     cherrypy.tools.cors = cherrypy.Tool("before_handler", _cors)
+    threads = int(os.getenv("REGISTRY_THREADS", "30"))
     conf = {
         "/": {
             "request.dispatch": cherrypy.dispatch.MethodDispatcher(),
@@ -540,8 +798,28 @@ def run():
             "tools.cors.on": True,
         }
     }
-    cherrypy.config.update({"server.socket_host": "0.0.0.0", "server.socket_port": 8080})
-    cherrypy.tree.mount(RegistryAPI(), "/", conf)
+    cherrypy.config.update(
+        {
+            "server.socket_host": "0.0.0.0",
+            "server.socket_port": 8080,
+            # live /events streams each keep a worker busy
+            "server.thread_pool": threads,
+        }
+    )
+    api = RegistryAPI()
+    # keep at least half the workers free for CRUD, /status and /command
+    api.live.max_clients = min(api.live.max_clients, max(1, threads // 2))
+    cherrypy.tree.mount(api, "/", conf)
+    cherrypy.tree.mount(
+        CatalogExportAPI(api),
+        "/export",
+        {"/": {"request.dispatch": cherrypy.dispatch.MethodDispatcher(), "tools.cors.on": True}},
+    )
+    cherrypy.tree.mount(
+        LiveEventsAPI(api.live),
+        "/events",
+        {"/": {"request.dispatch": cherrypy.dispatch.MethodDispatcher(), "tools.cors.on": True}},
+    )
     cherrypy.engine.start()
     cherrypy.engine.block()
 
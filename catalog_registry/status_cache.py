@@ -0,0 +1,156 @@
+"""Memoised /status document for the registry.
+
+The per-lab status list only changes when the catalog or the controller state
+changes, so it is built once per (catalog version, state version) and kept both
+as Python objects and as pre-serialized JSON. Serving /status then only splices
+the current timestamp onto the cached bytes.
+
+Every rebuild that actually changes a lab bumps a document version. It is
+exposed as the ETag (``<epoch>.<version>``, the epoch telling registry restarts
+apart) and lets clients ask for only the labs that changed since a version they
+already hold.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from Device_connectors import codec
+
+
+# removed-lab tombstones kept for delta responses; older `since` values get the full document
+MAX_TOMBSTONES = 1024
+
+
+class PreEncoded(bytes):
+    """A response body that is already JSON; the JSON output handlers send it as-is."""
+
+
+class Reply(NamedTuple):
+    """Body plus HTTP status and headers, for handlers that need more than a JSON body."""
+
+    body: Any
+    status: int = 200
+    headers: Dict[str, str] = {}
+
+
+class StatusDoc(NamedTuple):
+    version: int
+    labs: List[dict]
+    labs_json: bytes
+
+
+class StatusCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.epoch = format(int(time.time() * 1000), "x")
+        self._key: Optional[Hashable] = None
+        self._doc = StatusDoc(0, [], b"[]")
+        self._lab_versions: Dict[str, int] = {}  # lab_id -> version in which its entry last changed
+        self._removed: Dict[str, int] = {}  # lab_id -> version in which it disappeared
+        self._floor = 0  # deltas can be computed from any version >= floor
+        self.builds = 0
+        self.hits = 0
+
+    # ------------------------------------------------------------------ document
+    def current(self, key: Optional[Hashable], build: Callable[[], List[dict]]) -> StatusDoc:
+        """Return the document for key, calling build() only when key changed.
+
+        A ``None`` key means the state version is unknown; the document is then
+        rebuilt every time. Returned lists are shared and must not be mutated.
+        """
+        if key is not None and key == self._key:
+            self.hits += 1
+            return self._doc
+        labs = build()
+        with self._lock:
+            self.builds += 1
+            doc = self._doc
+            if self._record(labs):
+                doc = StatusDoc(doc.version + 1, labs, codec.dumps(labs))
+                self._doc = doc
+            self._key = key
+            return doc
+
+    def _record(self, labs: List[dict]) -> bool:
+        """Note which labs differ from the current document; return True if any did."""
+        version = self._doc.version + 1
+        previous = {lab["lab_id"]: lab for lab in self._doc.labs}
+        changed = False
+        for lab in labs:
+            lab_id = lab["lab_id"]
+            if previous.pop(lab_id, None) != lab:
+                self._lab_versions[lab_id] = version
+                self._removed.pop(lab_id, None)
+                changed = True
+        for lab_id in previous:
+            self._lab_versions.pop(lab_id, None)
+            self._removed[lab_id] = version
+            changed = True
+        while len(self._removed) > MAX_TOMBSTONES:
+            oldest = min(self._removed, key=self._removed.get)
+            self._floor = max(self._floor, self._removed.pop(oldest))
+        return changed or not self._doc.version
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+
+    # ------------------------------------------------------------------ versions
+    def tag(self, version: int) -> str:
+        return f"{self.epoch}.{version}"
+
+    def parse_tag(self, tag: Any) -> Optional[int]:
+        """Return the version of a tag issued by this process, else None."""
+        epoch, _, version = str(tag).strip().strip('"').partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def matches(self, if_none_match: Optional[str], version: int) -> bool:
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if self.parse_tag(candidate) == version:
+                return True
+        return False
+
+    def changes_since(self, since: int) -> Optional[Tuple[int, List[dict], List[str]]]:
+        """Return (version, changed labs, removed lab ids) after ``since``, or None if unknown."""
+        with self._lock:
+            doc = self._doc
+            if since < self._floor or since > doc.version:
+                return None
+            labs = [lab for lab in doc.labs if self._lab_versions.get(lab["lab_id"], 0) > since]
+            removed = [lab_id for lab_id, version in self._removed.items() if version > since]
+            return doc.version, labs, removed
+
+    # ------------------------------------------------------------------ encoding
+    def encode(self, doc: StatusDoc, ts: str) -> PreEncoded:
+        return PreEncoded(
+            b'{"labs":' + doc.labs_json + b',"version":' + codec.dumps(self.tag(doc.version)) + b',"ts":' + codec.dumps(ts) + b"}"
+        )
+
+    def encode_delta(self, version: int, since: int, labs: List[dict], removed: List[str], ts: str) -> PreEncoded:
+        return PreEncoded(
+            codec.dumps(
+                {
+                    "delta": True,
+                    "since": self.tag(since),
+                    "version": self.tag(version),
+                    "labs": labs,
+                    "removed": removed,
+                    "ts": ts,
+                }
+            )
+        )
+
+    def stats(self) -> dict:
+        return {"builds": self.builds, "hits": self.hits, "version": self.tag(self._doc.version)}
@@ -41,12 +41,17 @@ def validate_actuator(payload):
     return None
 
 def validate_thresholds_patch(patch):
-    allowed = {"t_high", "t_low", "h_high", "h_low", "off_delay_sec", "hysteresis"}
+    allowed = {"t_high", "t_low", "h_high", "h_low", "off_delay_sec", "hysteresis", "avg_window", "ema_alpha"}
     for k, v in patch.items():
         if k not in allowed:
             return f"unknown field: {k}"
         if not isinstance(v, (int, float)):
             return f"{k} must be number"
+    if "avg_window" in patch:
+        if not isinstance(patch["avg_window"], int) or not 1 <= patch["avg_window"] <= 10000:
+            return "avg_window must be an integer between 1 and 10000"
+    if "ema_alpha" in patch and not 0 < patch["ema_alpha"] <= 1:
+        return "ema_alpha must be in (0, 1]"
     return None
 
 def validate_command(payload):
@@ -61,3 +66,48 @@ def validate_command(payload):
     if action not in ("ON", "OFF"):
         return "action must be either 'ON' or 'OFF'"
     return None
+
+def validate_bulk(payload):
+    if not isinstance(payload, dict):
+        return "body must be an object"
+    unknown = set(payload) - {"labs", "sensors", "actuators", "thresholds"}
+    if unknown:
+        return f"unknown sections: {', '.join(sorted(unknown))}"
+    for section, validate, id_key in (
+        ("labs", validate_lab, "lab_id"),
+        ("sensors", validate_sensor, "sensor_id"),
+        ("actuators", validate_actuator, "actuator_id"),
+    ):
+        items = payload.get(section, [])
+        if not isinstance(items, list):
+            return f"{section} must be a list"
+        seen = set()
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                return f"{section}[{i}] must be an object"
+            err = validate(item)
+            if err:
+                return f"{section}[{i}]: {err}"
+            if item[id_key] in seen:
+                return f"{section}[{i}]: duplicate {id_key} '{item[id_key]}'"
+            seen.add(item[id_key])
+    thresholds = payload.get("thresholds", {})
+    if isinstance(thresholds, list):
+        # the /export line form: [{"lab_id": ..., "thresholds": {...}}, ...]
+        as_dict = {}
+        for i, entry in enumerate(thresholds):
+            if not isinstance(entry, dict) or "lab_id" not in entry or not isinstance(entry.get("thresholds"), dict):
+                return f"thresholds[{i}] must be an object with lab_id and thresholds"
+            if entry["lab_id"] in as_dict:
+                return f"thresholds[{i}]: duplicate lab_id '{entry['lab_id']}'"
+            as_dict[entry["lab_id"]] = entry["thresholds"]
+        thresholds = as_dict
+    if not isinstance(thresholds, dict):
+        return "thresholds must be an object of lab_id -> patch, or a list of {lab_id, thresholds}"
+    for lab_id, patch in thresholds.items():
+        if not isinstance(patch, dict):
+            return f"thresholds[{lab_id}] must be an object"
+        err = validate_thresholds_patch(patch)
+        if err:
+            return f"thresholds[{lab_id}]: {err}"
+    return None
@@ -0,0 +1,161 @@
+"""Vectorised evaluation of the automation rules for many labs at once.
+
+Produces exactly the same commands as ``rules.decide`` but packs every lab's
+latest reading, thresholds and actuator states into NumPy arrays so the
+fan/heater/humidifier/dehumidifier decisions for the whole fleet are computed in
+one pass. Falls back to per-lab ``rules.decide`` when NumPy is not installed.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from controller import rules
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+HAVE_NUMPY = np is not None
+
+# evaluation order inside a lab matches rules.decide
+_TYPES = ("fan", "dehumidifier", "humidifier", "heater")
+_FAN, _DEHUM, _HUM, _HEATER = range(len(_TYPES))
+
+# Packed arrays are kept between calls; a lab is only re-packed when its (immutable,
+# versioned) state_memory view or its thresholds object changes.
+_packed: Optional["_Packed"] = None
+
+
+class _Packed:
+    """Row layout (one row per actuator) plus the per-lab/per-row arrays derived from it."""
+
+    def __init__(self, lab_ids: Tuple[str, ...], index: Dict[str, Dict[str, List[str]]]):
+        # the index object itself is kept (and compared by identity) so its id can't be reused
+        self.index = index
+        self.lab_ids = lab_ids
+        act_ids: List[str] = []
+        act_lab: List[int] = []
+        act_type: List[int] = []
+        lab_rows: List[Tuple[int, int]] = []
+        for lab_idx, lab_id in enumerate(lab_ids):
+            start = len(act_ids)
+            by_type = index.get(lab_id, {})
+            for type_code, type_name in enumerate(_TYPES):
+                for actuator_id in by_type.get(type_name, ()):
+                    act_ids.append(actuator_id)
+                    act_lab.append(lab_idx)
+                    act_type.append(type_code)
+            lab_rows.append((start, len(act_ids)))
+        self.act_ids = tuple(act_ids)
+        self.act_lab_ids = tuple(lab_ids[lab_idx] for lab_idx in act_lab)
+        self.act_lab = np.asarray(act_lab, dtype=np.intp)
+        self.act_type = np.asarray(act_type, dtype=np.int8)
+        self.lab_rows = lab_rows
+        n_labs, n_rows = len(lab_ids), len(act_ids)
+        # per lab: (view version, thresholds object) last packed
+        self.stamp: List[Optional[tuple]] = [None] * n_labs
+        self.valid = np.zeros(n_labs, dtype=bool)
+        # columns: t, h, t_high, t_low, h_high, h_low, hysteresis, off_delay_sec
+        self.readings = np.zeros((n_labs, 8), dtype=np.float64)
+        self.is_on = np.zeros(n_rows, dtype=bool)
+        self.is_off = np.zeros(n_rows, dtype=bool)
+        self.ts = np.zeros(n_rows, dtype=np.float64)
+
+    def refresh(self, lab_idx: int, view: dict, th: Optional[dict]):
+        version = view.get("version")
+        previous = self.stamp[lab_idx]
+        if version is not None and previous is not None and previous[0] == version and previous[1] is th:
+            return
+        self.stamp[lab_idx] = (version, th) if version is not None else None
+        if not th or not view.get("sensors"):
+            self.valid[lab_idx] = False
+            return
+        t, h, _ = rules._latest_sensor_reading(view)
+        self.readings[lab_idx] = (
+            t,
+            h,
+            th["t_high"],
+            th["t_low"],
+            th["h_high"],
+            th["h_low"],
+            float(th.get("hysteresis", 0)),
+            float(th.get("off_delay_sec", 0)),
+        )
+        self.valid[lab_idx] = True
+        start, end = self.lab_rows[lab_idx]
+        actuators = view.get("actuators", {})
+        for row in range(start, end):
+            entry = actuators.get(self.act_ids[row], {})
+            state = entry.get("state", "OFF")
+            self.is_on[row] = state == "ON"
+            self.is_off[row] = state == "OFF"
+            self.ts[row] = entry.get("ts", 0)
+
+
+def decide_all(snapshot: Dict[str, dict], thresholds: Optional[Dict[str, dict]] = None) -> Dict[str, List[dict]]:
+    """Return {lab_id: [commands]} for every lab in snapshot.
+
+    ``thresholds`` optionally maps lab_id to thresholds used when a lab view has
+    none attached; labs with neither are skipped.
+    """
+    global _packed
+    thresholds = thresholds or {}
+    if not HAVE_NUMPY:
+        out: Dict[str, List[dict]] = {}
+        for lab_id, view in snapshot.items():
+            th = view.get("thresholds") or thresholds.get(lab_id)
+            if th:
+                cmds = rules.decide(lab_id, view, th)
+                if cmds:
+                    out[lab_id] = cmds
+        return out
+
+    index = rules.actuator_index()
+    lab_ids = tuple(snapshot)
+    packed = _packed
+    if packed is None or packed.index is not index or packed.lab_ids != lab_ids:
+        packed = _packed = _Packed(lab_ids, index)
+    if not packed.act_ids:
+        return {}
+    for lab_idx, (lab_id, view) in enumerate(snapshot.items()):
+        packed.refresh(lab_idx, view, view.get("thresholds") or thresholds.get(lab_id))
+
+    act_lab, act_type = packed.act_lab, packed.act_type
+    t, h, t_high, t_low, h_high, h_low, hyst, off_delay = packed.readings[act_lab].T
+    is_on, is_off = packed.is_on, packed.is_off
+
+    heat_needed = t < t_low
+    fan_force_on = ((t > t_high) | (h > h_high)) & ~heat_needed
+    fan_allow_off = (t < t_high - hyst) & (h < h_high - hyst)
+    fan_delay_ok = (packed.ts != 0) & ((time.time() - packed.ts) >= off_delay)
+    fan_on = fan_force_on & ~is_on
+    fan_off = (heat_needed & is_on) | (~heat_needed & fan_allow_off & is_on & fan_delay_ok)
+
+    dehum_on = (h > h_high) & ~is_on
+    dehum_off = (h <= h_high) & (h < h_high - hyst) & ~is_off
+    hum_on = (h < h_low) & ~is_on
+    hum_off = (h >= h_low) & (h > h_low + hyst) & ~is_off
+    heat_on = (t < t_low) & ~is_on
+    heat_off = (t >= t_low) & (t > t_low + hyst) & ~is_off
+
+    is_fan = act_type == _FAN
+    is_dehum = act_type == _DEHUM
+    is_hum = act_type == _HUM
+    is_heat = act_type == _HEATER
+    active = packed.valid[act_lab]
+    turn_on = active & ((is_fan & fan_on) | (is_dehum & dehum_on) | (is_hum & hum_on) | (is_heat & heat_on))
+    turn_off = active & ((is_fan & fan_off) | (is_dehum & dehum_off) | (is_hum & hum_off) | (is_heat & heat_off))
+
+    out: Dict[str, List[dict]] = {}
+    act_ids, act_lab_ids = packed.act_ids, packed.act_lab_ids
+    rows = np.flatnonzero(turn_on | turn_off)
+    for row, on in zip(rows.tolist(), turn_on[rows].tolist()):
+        out.setdefault(act_lab_ids[row], []).append({"actuator_id": act_ids[row], "action": "ON" if on else "OFF"})
+    return out
@@ -25,32 +25,47 @@ class ControlUnit:
         self.logger.info("Control unit ready loop_sec=%s", loop_sec)
 
     # ------------------------------------------------------------------ lifecycle
+    def evaluate_once(self) -> int:
+        """Run the rules once against the current lab view; return the number of commands sent."""
+        snapshot = sm.get_lab(self.lab_id)
+        if not snapshot:
+            return 0
+        thresholds = snapshot.get("thresholds", self._thresholds)
+        cmds = rules.decide(self.lab_id, snapshot, thresholds)
+        sent = 0
+        for cmd in cmds:
+            self.logger.info("Rule decision actuator=%s action=%s", cmd["actuator_id"], cmd["action"])
+            sent += ab.send_command(
+                self.mqtt,
+                self.lab_id,
+                cmd["actuator_id"],
+                cmd["action"],
+                source="rules",
+            )
+        self._thresholds = thresholds
+        return sent
+
     def loop_forever(self):
         while not self._stop.is_set():
-            snapshot = sm.get_lab(self.lab_id)
-            if snapshot:
-                thresholds = snapshot.get("thresholds", self._thresholds)
-                cmds = rules.decide(self.lab_id, snapshot, thresholds)
-                if cmds:
-                    for cmd in cmds:
-                        self.logger.info("Rule decision actuator=%s action=%s", cmd["actuator_id"], cmd["action"])
-                        ab.send_command(
-                            self.mqtt,
-                            self.lab_id,
-                            cmd["actuator_id"],
-                            cmd["action"],
-                            source="rules",
-                        )
-                self._thresholds = dict(thresholds)
+            self.evaluate_once()
             self._stop.wait(self.loop_sec)
         self.logger.info("Control unit stopped")
 
     def stop(self):
         self._stop.set()
 
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    @property
+    def thresholds(self) -> Dict[str, float]:
+        return self._thresholds
+
     # ---------------------------------------------------------------- updates
     def update_thresholds(self, thresholds: Dict[str, float]):
         """Refresh thresholds used by the control loop."""
         self._thresholds = dict(thresholds)
+        rules.invalidate(self.lab_id)
         sm.set_thresholds(self.lab_id, self._thresholds)
         self.logger.info("Thresholds updated %s", self._thresholds)
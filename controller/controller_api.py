@@ -8,12 +8,22 @@ import logging
 
 from controller.cu_instancer import get_manager
 from controller import state_memory as sm
+from Device_connectors import actuator_bridge, sensor_bridge
 from logging_setup import configure_logging
 
 configure_logging()
 logger = logging.getLogger("controller_api")
 
 
+def _csv(value):
+    """Split a ?a,b,c query value into a list (None when absent or empty)."""
+    if not value:
+        return None
+    if isinstance(value, list):
+        value = ",".join(value)
+    return [item.strip() for item in value.split(",") if item.strip()] or None
+
+
 def _ts():
     import datetime
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -27,14 +37,31 @@ class ControllerAPI:
         logger.info("Controller API started.")
 
     @cherrypy.tools.json_out()
-    def GET(self, *uri, **_params):
+    def GET(self, *uri, **params):
         if not uri:
-            return {"ok": True, "endpoints": ["/health", "/snapshot"]}
+            return {
+                "ok": True,
+                "endpoints": ["/health", "/snapshot[?labs=a,b&fields=sensors,alerts]", "/snapshot/{lab_id}", "/metrics"],
+            }
         path = uri[0].lower()
         if path == "health":
             return {"ok": True, "ts": _ts()}
         if path == "snapshot":
-            return sm.get_snapshot()
+            fields = _csv(params.get("fields"))
+            if len(uri) > 1:
+                lab = sm.get_lab(uri[1])
+                if not lab:
+                    return {"error": f"lab '{uri[1]}' not found"}
+                return sm.project(lab, fields)
+            return sm.get_labs(_csv(params.get("labs")), fields)
+        if path == "metrics":
+            return {
+                "mqtt": self.manager.mqtt_stats(),
+                "sensor_coalescer": sensor_bridge.coalescer_stats(),
+                "commands": actuator_bridge.command_stats(),
+                "state_version": sm.get_version(),
+                "ts": _ts(),
+            }
         return {"error": "invalid endpoint"}
 
 
@@ -4,17 +4,18 @@
 
 from __future__ import annotations
 
-import json
 import os
 import threading
 import logging
 import time
 from typing import Dict, List, Optional
 
+from catalog.catalog_store import read_json
 from Device_connectors import actuator_bridge, sensor_bridge
 from Device_connectors.mqtt_client import MqttClient
 from controller import rules, state_memory as sm
 from controller.control_unit import ControlUnit
+from controller.scheduler import AsyncioScheduler, BatchScheduler, EventScheduler
 from logging_setup import configure_logging
 
 configure_logging()
@@ -32,21 +33,17 @@ DEFAULT_THRESHOLDS = {
     "h_low": 40.0,
     "off_delay_sec": 60.0,
     "hysteresis": 2.0,
+    "avg_window": 3,
 }
 
 
-def _read_json(path: str) -> dict:
-    with open(path, "r", encoding="utf-8") as fh:
-        return json.load(fh)
-
-
 def load_catalog_labs(path: str = _LABS_PATH) -> List[dict]:
-    data = _read_json(path)
+    data = read_json(path)
     return list(data.get("labs", []))
 
 
 def load_thresholds(path: str = _THRESHOLDS_PATH) -> Dict[str, dict]:
-    data = _read_json(path)
+    data = read_json(path)
     per_lab = data.get("per_lab", {})
     default = data.get("default") or DEFAULT_THRESHOLDS
     out = {}
@@ -63,11 +60,19 @@ def load_thresholds(path: str = _THRESHOLDS_PATH) -> Dict[str, dict]:
 class ControllerManager:
     """Manage MQTT connection, state memory, and per-lab control units."""
 
-    def __init__(self, mqtt_host: str = "localhost", mqtt_port: int = 1883, loop_sec: int = 2):
+    def __init__(
+        self,
+        mqtt_host: str = "localhost",
+        mqtt_port: int = 1883,
+        loop_sec: int = 2,
+        runtime: str = "threads",
+    ):
         self.logger = logging.getLogger("ControllerManager")
         self.mqtt_host = mqtt_host
         self.mqtt_port = mqtt_port
         self.loop_sec = loop_sec
+        self.runtime = runtime
+        self._scheduler: Optional[EventScheduler | AsyncioScheduler | BatchScheduler] = None
         self._mqtt: Optional[MqttClient] = None
         self._control_units: Dict[str, ControlUnit] = {}
         self._threads: Dict[str, threading.Thread] = {}
@@ -100,6 +105,7 @@ class ControllerManager:
         actuator_bridge.wire(self._mqtt)
         rules.load_device_catalog(os.path.join(_CATALOG_DIR, "devices.json"))
         self.logger.info("MQTT connected and bridges wired")
+        self._start_runtime()
 
         for lab_id in lab_ids:
             self.ensure_lab(lab_id, thresholds_map.get(lab_id))
@@ -128,30 +134,64 @@ class ControllerManager:
             sm.init_labs([lab_id])
             sm.set_thresholds(lab_id, thresholds)
             control = ControlUnit(lab_id, self._mqtt, thresholds, loop_sec=self.loop_sec)
-            thread = threading.Thread(target=control.loop_forever, name=f"control_unit_{lab_id}", daemon=True)
-            thread.start()
             self._control_units[lab_id] = control
-            self._threads[lab_id] = thread
+            if self._scheduler:
+                self._scheduler.add(control)
+            else:
+                thread = threading.Thread(target=control.loop_forever, name=f"control_unit_{lab_id}", daemon=True)
+                thread.start()
+                self._threads[lab_id] = thread
             self.logger.info("Control unit launched lab=%s", lab_id)
 
     def remove_lab(self, lab_id: str):
         with self._lock:
             control = self._control_units.pop(lab_id, None)
             thread = self._threads.pop(lab_id, None)
+        if self._scheduler:
+            self._scheduler.remove(lab_id)
         if control:
             control.stop()
         if thread:
             thread.join(timeout=1)
+        actuator_bridge.forget_lab(lab_id)
         self.logger.info("Control unit removed lab=%s", lab_id)
 
+    def _start_runtime(self):
+        if self.runtime == "event":
+            try:
+                workers = int(os.getenv("CONTROL_WORKERS", "4"))
+                sweep_sec = float(os.getenv("CONTROL_SWEEP_SEC", "30"))
+            except ValueError:
+                workers, sweep_sec = 4, 30.0
+            self._scheduler = EventScheduler(workers=workers, sweep_sec=sweep_sec)
+            self._scheduler.start()
+        elif self.runtime == "asyncio":
+            try:
+                tick_sec = float(os.getenv("CONTROL_TICK_SEC", "0.25"))
+            except ValueError:
+                tick_sec = 0.25
+            self._scheduler = AsyncioScheduler(tick_sec=tick_sec)
+            self._scheduler.start()
+        elif self.runtime == "batch":
+            self._scheduler = BatchScheduler(loop_sec=self.loop_sec)
+            self._scheduler.start()
+        elif self.runtime != "threads":
+            self.logger.warning("Unknown CONTROL_RUNTIME=%s, falling back to threads", self.runtime)
+            self.runtime = "threads"
+        self.logger.info("Control runtime=%s", self.runtime)
+
     def reload_devices(self):
-        rules.load_device_catalog(os.path.join(_CATALOG_DIR, "devices.json"))
+        # called right after a registry save: don't rely on the mtime having moved
+        rules.load_device_catalog(os.path.join(_CATALOG_DIR, "devices.json"), force=True)
 
     def send_command(self, lab_id: str, actuator_id: str, action: str, source: str = "manual"):
         if self._mqtt is None:
             raise RuntimeError("ControllerManager not started")
         actuator_bridge.send_command(self._mqtt, lab_id, actuator_id, action, source=source)
 
+    def mqtt_stats(self) -> dict:
+        return self._mqtt.stats() if self._mqtt else {}
+
     def update_thresholds(self, lab_id: str, thresholds: dict):
         with self._lock:
             control = self._control_units.get(lab_id)
@@ -202,7 +242,8 @@ class ControllerManager:
             sim_loop = int(os.getenv("SIM_LOOP_SEC", "5"))
         except ValueError:
             sim_loop = 5
-        simulator = LabSimulator(self.mqtt_host, self.mqtt_port, loop_sec=sim_loop)
+        sensor_format = os.getenv("SIM_SENSOR_FORMAT", "json")
+        simulator = LabSimulator(self.mqtt_host, self.mqtt_port, loop_sec=sim_loop, sensor_format=sensor_format)
         try:
             simulator.start()
         except Exception as exc:
@@ -218,7 +259,7 @@ class ControllerManager:
         self._simulator = simulator
         self._sim_thread = threading.Thread(target=_run, name="lab_simulator", daemon=True)
         self._sim_thread.start()
-        self.logger.info("Mock sensor simulator started (interval=%ss)", sim_loop)
+        self.logger.info("Mock sensor simulator started (interval=%ss format=%s)", sim_loop, sensor_format)
 
     # ------------------------------------------------------------------ teardown
     def stop(self):
@@ -231,6 +272,9 @@ class ControllerManager:
             control.stop()
         for _, thread in threads:
             thread.join(timeout=1)
+        if self._scheduler:
+            self._scheduler.stop()
+            self._scheduler = None
         if self._mqtt:
             self._mqtt.disconnect()
             self._mqtt = None
@@ -254,7 +298,8 @@ def get_manager() -> ControllerManager:
         host = os.getenv("MQTT_HOST", "localhost")
         port = int(os.getenv("MQTT_PORT", "1883"))
         loop_sec = int(os.getenv("CONTROL_LOOP_SEC", "2"))
-        _GLOBAL_MANAGER = ControllerManager(mqtt_host=host, mqtt_port=port, loop_sec=loop_sec)
+        runtime = os.getenv("CONTROL_RUNTIME", "threads").lower()
+        _GLOBAL_MANAGER = ControllerManager(mqtt_host=host, mqtt_port=port, loop_sec=loop_sec, runtime=runtime)
         _GLOBAL_MANAGER.start()
     return _GLOBAL_MANAGER
 
@@ -0,0 +1,88 @@
+"""Fixed-size ring buffer with O(1) rolling statistics for sensor history."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections import deque
+from typing import List, Optional
+
+
+class RollingWindow:
+    """Array-backed ring buffer over a float series.
+
+    Mean comes from a running sum, min/max from monotonic deques (amortised O(1))
+    and the EMA is updated incrementally, so the per-sample cost does not grow
+    with the window length.
+    """
+
+    __slots__ = ("size", "alpha", "ema", "_buf", "_head", "_count", "_sum", "_seq", "_min_q", "_max_q")
+
+    def __init__(self, size: int, alpha: Optional[float] = None):
+        self.size = max(1, int(size))
+        self.alpha = float(alpha) if alpha else 2.0 / (self.size + 1)
+        self.ema: Optional[float] = None
+        self._buf = array("d", bytes(8 * self.size))
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+        self._seq = 0
+        self._min_q: deque = deque()  # (seq, value), values increasing
+        self._max_q: deque = deque()  # (seq, value), values decreasing
+
+    def push(self, value: float) -> None:
+        value = float(value)
+        if self._count == self.size:
+            self._sum -= self._buf[self._head]
+        else:
+            self._count += 1
+        self._buf[self._head] = value
+        self._sum += value
+        self._head = (self._head + 1) % self.size
+        if self._head == 0:
+            # resync once per lap so floating point drift in the running sum cannot accumulate
+            self._sum = math.fsum(self._buf)
+
+        self._seq += 1
+        oldest = self._seq - self._count
+        while self._min_q and self._min_q[-1][1] >= value:
+            self._min_q.pop()
+        self._min_q.append((self._seq, value))
+        while self._min_q[0][0] <= oldest:
+            self._min_q.popleft()
+        while self._max_q and self._max_q[-1][1] <= value:
+            self._max_q.pop()
+        self._max_q.append((self._seq, value))
+        while self._max_q[0][0] <= oldest:
+            self._max_q.popleft()
+
+        self.ema = value if self.ema is None else self.alpha * value + (1.0 - self.alpha) * self.ema
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    @property
+    def min(self) -> float:
+        return self._min_q[0][1] if self._min_q else 0.0
+
+    @property
+    def max(self) -> float:
+        return self._max_q[0][1] if self._max_q else 0.0
+
+    def values(self) -> List[float]:
+        """Samples currently in the window, oldest first."""
+        start = (self._head - self._count) % self.size
+        return [self._buf[(start + i) % self.size] for i in range(self._count)]
+
+    def resized(self, size: int, alpha: Optional[float] = None) -> "RollingWindow":
+        """Return a new window of the given size seeded with the most recent samples."""
+        out = RollingWindow(size, alpha)
+        for value in self.values()[-out.size:]:
+            out.push(value)
+        if self.ema is not None:
+            out.ema = self.ema
+        return out
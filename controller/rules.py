@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
-import json
 import os
 import time
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 import logging
 
+from catalog.catalog_store import catalog_mtime, read_json
+
 
 logger = logging.getLogger(__name__)
 
@@ -20,20 +22,58 @@ _DEFAULT_DEVICE_PATH = os.path.normpath(
 # lab_id -> actuator_type -> [actuator_id]
 _actuator_index: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
 _device_path: str | None = None
-
-
-def load_device_catalog(path: str | None = None) -> None:
-    """Load devices.json and build quick lookup tables for actuators."""
-    global _actuator_index, _device_path
+# (path, catalog_mtime) of the last load, so an unchanged catalog is not reloaded
+_device_stamp: Optional[Tuple[str, Optional[float]]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRules:
+    """Per-lab decision table: threshold bounds and actuator ids resolved once."""
+
+    source: dict  # thresholds object this was compiled from (checked by identity)
+    t_high: float
+    t_low: float
+    h_high: float
+    h_low: float
+    off_delay: float
+    fan_off_t: float  # t_high - hysteresis
+    h_high_off: float  # h_high - hysteresis (fan and dehumidifier)
+    h_low_off: float  # h_low + hysteresis
+    t_low_off: float  # t_low + hysteresis
+    fans: Tuple[str, ...]
+    dehumidifiers: Tuple[str, ...]
+    humidifiers: Tuple[str, ...]
+    heaters: Tuple[str, ...]
+
+
+# lab_id -> compiled table; dropped on load_device_catalog() or invalidate()
+_compiled: Dict[str, CompiledRules] = {}
+
+
+def load_device_catalog(path: str | None = None, force: bool = False) -> None:
+    """Load devices.json and build quick lookup tables for actuators.
+
+    Does nothing when the catalog (file or journal) is unchanged since the last
+    load, so compiled rules survive the periodic catalog watcher; ``force``
+    reloads regardless.
+    """
+    global _actuator_index, _device_path, _device_stamp
     catalog_path = path or _DEFAULT_DEVICE_PATH
-    if not os.path.exists(catalog_path):
+    try:
+        stamp = (catalog_path, catalog_mtime(catalog_path))
+    except OSError:
+        stamp = (catalog_path, None)
+    if not force and stamp == _device_stamp:
+        return
+    _device_stamp = stamp
+    if stamp[1] is None:
         logger.warning("devices catalog missing at %s", catalog_path)
         _actuator_index = defaultdict(lambda: defaultdict(list))
         _device_path = catalog_path
+        invalidate()
         return
 
-    with open(catalog_path, "r", encoding="utf-8") as fh:
-        raw = json.load(fh)
+    raw = read_json(catalog_path)
 
     idx: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
     for act in raw.get("actuators", []):
@@ -48,6 +88,7 @@ def load_device_catalog(path: str | None = None) -> None:
 
     _actuator_index = idx
     _device_path = catalog_path
+    invalidate()
     total = 0
     for type_map in idx.values():
         for actuators in type_map.values():
@@ -55,18 +96,48 @@ def load_device_catalog(path: str | None = None) -> None:
     logger.info("Loaded %d actuators from %s", total, catalog_path)
 
 
-def _actuators_of_type(lab_id: str, act_type: str) -> List[str]:
+def actuator_index() -> Dict[str, Dict[str, List[str]]]:
+    """Return the current lab -> type -> [actuator_id] table (replaced, never mutated, on reload)."""
     if not _actuator_index and _device_path is None:
         load_device_catalog()
-    return list(_actuator_index.get(lab_id, {}).get(act_type, []))
-
-
-def _act_state(lab_snapshot: dict, actuator_id: str) -> str:
-    return lab_snapshot.get("actuators", {}).get(actuator_id, {}).get("state", "OFF")
-
-
-def _act_timestamp(lab_snapshot: dict, actuator_id: str) -> int:
-    return lab_snapshot.get("actuators", {}).get(actuator_id, {}).get("ts", 0)
+    return _actuator_index
+
+
+def invalidate(lab_id: Optional[str] = None) -> None:
+    """Drop compiled rules for one lab (thresholds changed) or all labs (catalog reloaded)."""
+    global _compiled
+    if lab_id is None:
+        _compiled = {}
+    else:
+        _compiled.pop(lab_id, None)
+
+
+def compile_rules(lab_id: str, thresholds: dict) -> CompiledRules:
+    """Precompute bounds and actuator tuples for lab_id and cache the result."""
+    hysteresis = float(thresholds.get("hysteresis", 0))
+    t_high = float(thresholds["t_high"])
+    t_low = float(thresholds["t_low"])
+    h_high = float(thresholds["h_high"])
+    h_low = float(thresholds["h_low"])
+    by_type = actuator_index().get(lab_id, {})
+    rule = CompiledRules(
+        source=thresholds,
+        t_high=t_high,
+        t_low=t_low,
+        h_high=h_high,
+        h_low=h_low,
+        off_delay=float(thresholds.get("off_delay_sec", 0)),
+        fan_off_t=t_high - hysteresis,
+        h_high_off=h_high - hysteresis,
+        h_low_off=h_low + hysteresis,
+        t_low_off=t_low + hysteresis,
+        fans=tuple(by_type.get("fan", ())),
+        dehumidifiers=tuple(by_type.get("dehumidifier", ())),
+        humidifiers=tuple(by_type.get("humidifier", ())),
+        heaters=tuple(by_type.get("heater", ())),
+    )
+    _compiled[lab_id] = rule
+    return rule
 
 
 def _latest_sensor_reading(lab_snapshot: dict) -> Tuple[float, float, int]:
@@ -79,61 +150,68 @@ def _latest_sensor_reading(lab_snapshot: dict) -> Tuple[float, float, int]:
     return float(t_val), float(h_val), int(latest.get("ts", 0))
 
 
+_NO_ENTRY: dict = {}
+
+
 def decide(lab_id: str, lab_snapshot: dict, thresholds: dict) -> List[dict]:
     """Return a list of actuator commands to keep the environment within thresholds."""
     if not lab_snapshot.get("sensors"):
         return []
 
+    rule = _compiled.get(lab_id)
+    if rule is None or rule.source is not thresholds:
+        rule = compile_rules(lab_id, thresholds)
+
     t, h, _ = _latest_sensor_reading(lab_snapshot)
-    th = thresholds
+    actuators = lab_snapshot.get("actuators", _NO_ENTRY)
     cmds: List[dict] = []
 
-    off_delay = float(th.get("off_delay_sec", 0))
-    hysteresis = float(th.get("hysteresis", 0))
-    heat_needed = t < th["t_low"]
+    heat_needed = t < rule.t_low
 
     # Fan with hysteresis around high thresholds; heater has priority
-    for actuator_id in _actuators_of_type(lab_id, "fan"):
-        current_state = _act_state(lab_snapshot, actuator_id)
-        should_force_on = (t > th["t_high"] or h > th["h_high"]) and not heat_needed
+    if rule.fans:
+        should_force_on = (t > rule.t_high or h > rule.h_high) and not heat_needed
         # turn off when both temp and humidity are comfortably below the high thresholds minus hysteresis
-        should_allow_off = (t < (th["t_high"] - hysteresis)) and (h < (th["h_high"] - hysteresis))
-        if heat_needed and current_state == "ON":
-            cmds.append({"actuator_id": actuator_id, "action": "OFF"})
-        elif should_force_on and current_state != "ON":
-            cmds.append({"actuator_id": actuator_id, "action": "ON"})
-        elif should_allow_off and current_state == "ON":
-            last_ts = _act_timestamp(lab_snapshot, actuator_id)
-            if last_ts and (time.time() - last_ts) >= off_delay:
+        should_allow_off = t < rule.fan_off_t and h < rule.h_high_off
+        for actuator_id in rule.fans:
+            entry = actuators.get(actuator_id, _NO_ENTRY)
+            current_state = entry.get("state", "OFF")
+            if heat_needed and current_state == "ON":
                 cmds.append({"actuator_id": actuator_id, "action": "OFF"})
+            elif should_force_on and current_state != "ON":
+                cmds.append({"actuator_id": actuator_id, "action": "ON"})
+            elif should_allow_off and current_state == "ON":
+                last_ts = entry.get("ts", 0)
+                if last_ts and (time.time() - last_ts) >= rule.off_delay:
+                    cmds.append({"actuator_id": actuator_id, "action": "OFF"})
 
     # Dehumidifier
-    for actuator_id in _actuators_of_type(lab_id, "dehumidifier"):
-        current_state = _act_state(lab_snapshot, actuator_id)
-        if h > th["h_high"]:
+    for actuator_id in rule.dehumidifiers:
+        current_state = actuators.get(actuator_id, _NO_ENTRY).get("state", "OFF")
+        if h > rule.h_high:
             if current_state != "ON":
                 cmds.append({"actuator_id": actuator_id, "action": "ON"})
-        elif h < th["h_high"] - hysteresis:
+        elif h < rule.h_high_off:
             if current_state != "OFF":
                 cmds.append({"actuator_id": actuator_id, "action": "OFF"})
 
     # Humidifier
-    for actuator_id in _actuators_of_type(lab_id, "humidifier"):
-        current_state = _act_state(lab_snapshot, actuator_id)
-        if h < th["h_low"]:
+    for actuator_id in rule.humidifiers:
+        current_state = actuators.get(actuator_id, _NO_ENTRY).get("state", "OFF")
+        if h < rule.h_low:
             if current_state != "ON":
                 cmds.append({"actuator_id": actuator_id, "action": "ON"})
-        elif h > th["h_low"] + hysteresis:
+        elif h > rule.h_low_off:
             if current_state != "OFF":
                 cmds.append({"actuator_id": actuator_id, "action": "OFF"})
 
     # Heater
-    for actuator_id in _actuators_of_type(lab_id, "heater"):
-        current_state = _act_state(lab_snapshot, actuator_id)
-        if t < th["t_low"]:
+    for actuator_id in rule.heaters:
+        current_state = actuators.get(actuator_id, _NO_ENTRY).get("state", "OFF")
+        if heat_needed:
             if current_state != "ON":
                 cmds.append({"actuator_id": actuator_id, "action": "ON"})
-        elif t > th["t_low"] + hysteresis:
+        elif t > rule.t_low_off:
             if current_state != "OFF":
                 cmds.append({"actuator_id": actuator_id, "action": "OFF"})
 
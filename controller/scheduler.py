@@ -0,0 +1,312 @@
+"""Alternative runtimes that drive control units without a thread per lab."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from Device_connectors import actuator_bridge as ab
+from controller import batch_rules, state_memory as sm
+from controller.control_unit import ControlUnit
+
+
+class EventScheduler:
+    """Evaluate a lab only when its state changes, using a small shared worker pool.
+
+    state_memory notifies the scheduler after every sensor, actuator or threshold
+    update; the lab is queued once (duplicate notifications collapse) and a worker
+    evaluates it right away. A lab is never evaluated by two workers at once: if it
+    changes while being evaluated it is re-queued when the current run finishes.
+    An optional slow sweep re-queues every lab so time-based rules (off_delay_sec)
+    still fire when no new readings arrive.
+    """
+
+    def __init__(self, workers: int = 4, sweep_sec: float = 30.0):
+        self.logger = logging.getLogger("EventScheduler")
+        self.workers = max(1, int(workers))
+        self.sweep_sec = float(sweep_sec)
+        self._units: Dict[str, ControlUnit] = {}
+        self._dirty: "OrderedDict[str, None]" = OrderedDict()
+        self._running: Set[str] = set()
+        self._rerun: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # ------------------------------------------------------------------ lifecycle
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        sm.add_listener(self.mark_dirty)
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"control_worker_{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.sweep_sec > 0:
+            thread = threading.Thread(target=self._sweep, name="control_sweep", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info("Event scheduler started workers=%s sweep_sec=%s", self.workers, self.sweep_sec)
+
+    def stop(self):
+        sm.remove_listener(self.mark_dirty)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        self.logger.info("Event scheduler stopped")
+
+    # ------------------------------------------------------------------ units
+    def add(self, control: ControlUnit):
+        with self._cond:
+            self._units[control.lab_id] = control
+        self.mark_dirty(control.lab_id)
+
+    def remove(self, lab_id: str):
+        with self._cond:
+            self._units.pop(lab_id, None)
+            self._dirty.pop(lab_id, None)
+            self._rerun.discard(lab_id)
+
+    def mark_dirty(self, lab_id: str):
+        with self._cond:
+            if lab_id not in self._units:
+                return
+            if lab_id in self._running:
+                self._rerun.add(lab_id)
+                return
+            if lab_id in self._dirty:
+                return
+            self._dirty[lab_id] = None
+            self._cond.notify()
+
+    # ------------------------------------------------------------------ workers
+    def _work(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._dirty and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                lab_id, _ = self._dirty.popitem(last=False)
+                control = self._units.get(lab_id)
+                if control is None:
+                    continue
+                self._running.add(lab_id)
+            try:
+                control.evaluate_once()
+            except Exception as exc:
+                self.logger.error("Evaluation failed lab=%s: %s", lab_id, exc)
+            finally:
+                with self._cond:
+                    self._running.discard(lab_id)
+                    if lab_id in self._rerun:
+                        self._rerun.discard(lab_id)
+                        if lab_id in self._units:
+                            self._dirty[lab_id] = None
+                            self._cond.notify()
+
+    def _sweep(self):
+        while not self._stop.wait(self.sweep_sec):
+            with self._cond:
+                lab_ids = list(self._units)
+            for lab_id in lab_ids:
+                self.mark_dirty(lab_id)
+
+
+class TimerWheel:
+    """Hashed timer wheel driving many periodic sleepers from a single tick task.
+
+    Inserting a sleeper is O(1) (append to a slot) and each tick only touches the
+    current slot, so thousands of control units cost one timer on the event loop
+    instead of one heap entry each. Delays are rounded up to whole ticks.
+    """
+
+    def __init__(self, tick_sec: float = 0.25, slots: int = 256):
+        self.tick_sec = max(0.01, float(tick_sec))
+        self._slots: List[List[list]] = [[] for _ in range(max(1, int(slots)))]
+        self._cursor = 0
+
+    def sleep(self, delay: float) -> "asyncio.Future":
+        """Return a future resolved after at least ``delay`` seconds (must run on the loop)."""
+        fut = asyncio.get_running_loop().create_future()
+        ticks = max(1, math.ceil(float(delay) / self.tick_sec))
+        size = len(self._slots)
+        # [remaining rounds, future]; an entry is visited every `size` ticks until rounds hits zero
+        self._slots[(self._cursor + ticks) % size].append([(ticks - 1) // size, fut])
+        return fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += self.tick_sec
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            # catch up on ticks missed while the loop was busy
+            while deadline <= loop.time() + 1e-9:
+                self._advance()
+                if deadline + self.tick_sec > loop.time():
+                    break
+                deadline += self.tick_sec
+
+    def _advance(self):
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot = self._slots[self._cursor]
+        if not slot:
+            return
+        pending = []
+        for entry in slot:
+            if entry[1].done():
+                continue
+            if entry[0] == 0:
+                entry[1].set_result(None)
+            else:
+                entry[0] -= 1
+                pending.append(entry)
+        self._slots[self._cursor] = pending
+
+
+class AsyncioScheduler:
+    """Run every control unit as a lightweight task on one asyncio loop.
+
+    The loop lives in a single background thread; ensure_lab/remove_lab from other
+    threads are marshalled onto it with call_soon_threadsafe. Each unit's task
+    evaluates its lab and then parks on the shared TimerWheel for loop_sec.
+    """
+
+    def __init__(self, tick_sec: float = 0.25, slots: int = 256):
+        self.logger = logging.getLogger("AsyncioScheduler")
+        self._wheel = TimerWheel(tick_sec=tick_sec, slots=slots)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: Dict[str, asyncio.Task] = {}  # only touched on the loop thread
+
+    # ------------------------------------------------------------------ lifecycle
+    def start(self):
+        if self._thread:
+            return
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.call_soon(ready.set)
+            self._loop.create_task(self._wheel.run())
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="control_asyncio", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+        self.logger.info("Asyncio scheduler started tick_sec=%s", self._wheel.tick_sec)
+
+    def stop(self):
+        if not self._loop or not self._thread:
+            return
+
+        def _shutdown():
+            for task in asyncio.all_tasks(self._loop):
+                task.cancel()
+            self._tasks.clear()
+            self._loop.call_soon(self._loop.stop)
+
+        self._loop.call_soon_threadsafe(_shutdown)
+        self._thread.join(timeout=2)
+        self._thread = None
+        self._loop = None
+        self.logger.info("Asyncio scheduler stopped")
+
+    # ------------------------------------------------------------------ units
+    def add(self, control: ControlUnit):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._spawn, control)
+
+    def remove(self, lab_id: str):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._cancel, lab_id)
+
+    def _spawn(self, control: ControlUnit):
+        self._cancel(control.lab_id)
+        self._tasks[control.lab_id] = self._loop.create_task(
+            self._run_unit(control), name=f"control_unit_{control.lab_id}"
+        )
+
+    def _cancel(self, lab_id: str):
+        task = self._tasks.pop(lab_id, None)
+        if task:
+            task.cancel()
+
+    async def _run_unit(self, control: ControlUnit):
+        while not control.stopped:
+            try:
+                control.evaluate_once()
+            except Exception as exc:
+                self.logger.error("Evaluation failed lab=%s: %s", control.lab_id, exc)
+            await self._wheel.sleep(control.loop_sec)
+
+
+class BatchScheduler:
+    """Evaluate every lab in one vectorised pass per tick (see controller.batch_rules)."""
+
+    def __init__(self, loop_sec: float = 2.0):
+        self.logger = logging.getLogger("BatchScheduler")
+        self.loop_sec = float(loop_sec)
+        self._units: Dict[str, ControlUnit] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread:
+            return
+        if not batch_rules.HAVE_NUMPY:
+            self.logger.warning("NumPy not installed; batch runtime falls back to per-lab rules")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="control_batch", daemon=True)
+        self._thread.start()
+        self.logger.info("Batch scheduler started loop_sec=%s", self.loop_sec)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+        self.logger.info("Batch scheduler stopped")
+
+    def add(self, control: ControlUnit):
+        with self._lock:
+            self._units[control.lab_id] = control
+
+    def remove(self, lab_id: str):
+        with self._lock:
+            self._units.pop(lab_id, None)
+
+    def evaluate_once(self) -> int:
+        with self._lock:
+            units = dict(self._units)
+        snapshot = sm.get_snapshot()
+        views = {lab_id: snapshot[lab_id] for lab_id in units if lab_id in snapshot}
+        fallback = {lab_id: control.thresholds for lab_id, control in units.items()}
+        decisions = batch_rules.decide_all(views, fallback)
+        sent = 0
+        for lab_id, cmds in decisions.items():
+            control = units[lab_id]
+            for cmd in cmds:
+                control.logger.info("Rule decision actuator=%s action=%s", cmd["actuator_id"], cmd["action"])
+                sent += ab.send_command(control.mqtt, lab_id, cmd["actuator_id"], cmd["action"], source="rules")
+        return sent
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.evaluate_once()
+            except Exception as exc:
+                self.logger.error("Batch evaluation failed: %s", exc)
+            self._stop.wait(self.loop_sec)
@@ -1,90 +1,248 @@
 # controller/state_memory.py
 from __future__ import annotations
-import threading, time, copy, logging
-from typing import Dict, Any, List, Tuple
+import itertools, threading, time, logging
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+from controller.rolling_window import RollingWindow
 
 logger = logging.getLogger(__name__)
 
-_lock = threading.Lock()
-_state: Dict[str, Dict[str, Any]] = {}
-_history: Dict[str, Dict[str, List[Tuple[float, float]]]] = {}
-_thresholds: Dict[str, Dict[str, Any]] = {}
+# Each lab owns its own lock so ingest for one lab never blocks readers of another.
+# _registry_lock only guards creation of lab slots and is never held while copying state.
+_registry_lock = threading.Lock()
+_locks: Dict[str, threading.Lock] = {}
+# lab_id -> sensor_id -> (temperature window, humidity window)
+_history: Dict[str, Dict[str, Tuple[RollingWindow, RollingWindow]]] = {}
+
+DEFAULT_AVG_WINDOW = 3
+
+# Copy-on-write views: writers build a new lab dict (sharing untouched sub-dicts with the
+# previous one) and swap it in; readers just grab the reference. Published dicts are
+# never mutated after the swap, so callers must treat them as read-only.
+_published: Dict[str, Dict[str, Any]] = {}
+_lab_seq = itertools.count(1)
+_gen_lock = threading.Lock()
+_generation = 0
+_snapshot_cache: Tuple[int, Dict[str, Dict[str, Any]]] = (-1, {})
+
+# callbacks fired with lab_id after sensor, actuator or threshold changes (outside the lab lock)
+_listeners: List[Callable[[str], None]] = []
+
+def _new_lab() -> Dict[str, Any]:
+    return {
+        "sensors": {},          # sensor_id -> {t,h,ts}
+        "actuators": {},        # actuator_id -> {state,ts}
+        "last_sensor_seen": 0,
+        "alerts": {"sensor_offline": False},
+        "version": next(_lab_seq),
+    }
+
+def _lab_lock(lab_id: str) -> threading.Lock:
+    """Return the lock for lab_id, creating the lab slot on first use."""
+    lock = _locks.get(lab_id)
+    if lock is not None:
+        return lock
+    with _registry_lock:
+        lock = _locks.get(lab_id)
+        if lock is None:
+            lock = threading.Lock()
+            _history[lab_id] = {}
+            _published[lab_id] = _new_lab()
+            _locks[lab_id] = lock
+            _bump_generation()
+        return lock
+
+def _bump_generation() -> None:
+    global _generation
+    with _gen_lock:
+        _generation += 1
+
+def _publish(lab_id: str, lab: Dict[str, Any]) -> None:
+    """Swap in a new view of lab_id (caller holds the lab lock)."""
+    lab["version"] = next(_lab_seq)
+    _published[lab_id] = lab
+    # bump after the swap so a reader that sees the new generation also sees the new lab
+    _bump_generation()
+
+def add_listener(callback: Callable[[str], None]) -> None:
+    """Register callback(lab_id) to be notified when a lab's inputs change."""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def remove_listener(callback: Callable[[str], None]) -> None:
+    try:
+        _listeners.remove(callback)
+    except ValueError:
+        pass
+
+def _notify(lab_id: str) -> None:
+    for callback in list(_listeners):
+        try:
+            callback(lab_id)
+        except Exception:
+            logger.exception("State listener failed for lab=%s", lab_id)
+
+def get_version() -> int:
+    """Fleet-wide state version; changes whenever any lab view is republished."""
+    return _generation
 
 def init_labs(lab_ids: list[str]) -> None:
-    with _lock:
-        for lab_id in lab_ids:
-            if lab_id not in _state:
-                _state[lab_id] = {
-                    "sensors": {},          # sensor_id -> {t,h,ts}
-                    "actuators": {},        # actuator_id -> {state,ts}
-                    "last_sensor_seen": 0,
-                    "alerts": {"sensor_offline": False},
-                }
+    for lab_id in lab_ids:
+        _lab_lock(lab_id)
 
 def set_thresholds(lab_id: str, thresholds: dict) -> None:
-    with _lock:
-        _thresholds[lab_id] = thresholds
+    with _lab_lock(lab_id):
+        old = _published[lab_id]
+        if old.get("thresholds") == thresholds:
+            return
+        _publish(lab_id, {**old, "thresholds": dict(thresholds)})
+    _notify(lab_id)
+
+def _windows(lab_id: str, sensor_id: str, thresholds: dict) -> Tuple[RollingWindow, RollingWindow]:
+    """Return the sensor's rolling windows, resizing them if the lab's avg_window changed."""
+    size = int(thresholds.get("avg_window") or DEFAULT_AVG_WINDOW)
+    alpha = thresholds.get("ema_alpha")
+    lab_hist = _history[lab_id]
+    windows = lab_hist.get(sensor_id)
+    if windows is None:
+        windows = (RollingWindow(size, alpha), RollingWindow(size, alpha))
+        lab_hist[sensor_id] = windows
+    elif windows[0].size != max(1, size) or (alpha and windows[0].alpha != float(alpha)):
+        windows = (windows[0].resized(size, alpha), windows[1].resized(size, alpha))
+        lab_hist[sensor_id] = windows
+    return windows
+
+def _sensor_entry(lab_id: str, sensor_id: str, thresholds: dict, t: float, h: float, ts: int) -> Dict[str, Any]:
+    win_t, win_h = _windows(lab_id, sensor_id, thresholds)
+    win_t.push(t)
+    win_h.push(h)
+    return {
+        "t": float(t),
+        "h": float(h),
+        "ts": int(ts),
+        "avg_t": win_t.mean,
+        "avg_h": win_h.mean,
+        "min_t": win_t.min,
+        "max_t": win_t.max,
+        "min_h": win_h.min,
+        "max_h": win_h.max,
+        "ema_t": win_t.ema,
+        "ema_h": win_h.ema,
+    }
+
+def _publish_sensors(lab_id: str, old: Dict[str, Any], sensors: Dict[str, Any], last_seen: int) -> None:
+    alerts = old["alerts"]
+    if alerts.get("sensor_offline"):
+        alerts = {**alerts, "sensor_offline": False}
+    _publish(lab_id, {**old, "sensors": sensors, "last_sensor_seen": last_seen, "alerts": alerts})
 
 def update_sensor(lab_id: str, sensor_id: str, t: float, h: float, ts: int) -> None:
-    with _lock:
-        if lab_id not in _state:
-            init_labs([lab_id])
-        hist = _history.setdefault(lab_id, {}).setdefault(sensor_id, [])
-        hist.append((float(t), float(h)))
-        if len(hist) > 3:
-            hist.pop(0)
-        avg_t = sum(x[0] for x in hist) / len(hist)
-        avg_h = sum(x[1] for x in hist) / len(hist)
-        _state[lab_id]["sensors"][sensor_id] = {"t": float(t), "h": float(h), "ts": int(ts)}
-        _state[lab_id]["sensors"][sensor_id]["avg_t"] = avg_t
-        _state[lab_id]["sensors"][sensor_id]["avg_h"] = avg_h
-        _state[lab_id]["last_sensor_seen"] = int(ts)
-        _state[lab_id]["alerts"]["sensor_offline"] = False
-        logger.info("Sensor update lab=%s sensor=%s t=%.2f h=%.2f ts=%s", lab_id, sensor_id, t, h, ts)
+    with _lab_lock(lab_id):
+        old = _published[lab_id]
+        sensors = dict(old["sensors"])
+        sensors[sensor_id] = _sensor_entry(lab_id, sensor_id, old.get("thresholds") or {}, t, h, ts)
+        _publish_sensors(lab_id, old, sensors, int(ts))
+    logger.info("Sensor update lab=%s sensor=%s t=%.2f h=%.2f ts=%s", lab_id, sensor_id, t, h, ts)
+    _notify(lab_id)
+
+def update_sensors(lab_id: str, readings: Iterable[Tuple[str, float, float, int]]) -> int:
+    """Apply many (sensor_id, t, h, ts) readings for one lab under a single lock and publish once.
+
+    Readings are applied in order, so several readings for the same sensor all feed
+    its rolling window. Returns the number of readings applied.
+    """
+    count = 0
+    with _lab_lock(lab_id):
+        old = _published[lab_id]
+        thresholds = old.get("thresholds") or {}
+        sensors = dict(old["sensors"])
+        last_seen = 0
+        for sensor_id, t, h, ts in readings:
+            sensors[sensor_id] = _sensor_entry(lab_id, sensor_id, thresholds, t, h, ts)
+            last_seen = max(last_seen, int(ts))
+            count += 1
+        if not count:
+            return 0
+        _publish_sensors(lab_id, old, sensors, last_seen)
+    logger.info("Sensor batch update lab=%s readings=%s ts=%s", lab_id, count, last_seen)
+    _notify(lab_id)
+    return count
 
 def update_actuator_state(lab_id: str, actuator_id: str, state: str, ts: int) -> None:
-    with _lock:
-        if lab_id not in _state:
-            init_labs([lab_id])
-        _state[lab_id]["actuators"][actuator_id] = {"state": state, "ts": int(ts)}
-        logger.info("Actuator feedback lab=%s actuator=%s state=%s ts=%s", lab_id, actuator_id, state, ts)
+    with _lab_lock(lab_id):
+        old = _published[lab_id]
+        actuators = dict(old["actuators"])
+        actuators[actuator_id] = {"state": state, "ts": int(ts)}
+        _publish(lab_id, {**old, "actuators": actuators})
+    logger.info("Actuator feedback lab=%s actuator=%s state=%s ts=%s", lab_id, actuator_id, state, ts)
+    _notify(lab_id)
 
 def get_lab(lab_id: str) -> dict:
-    with _lock:
-        out = copy.deepcopy(_state.get(lab_id, {}))
-        if lab_id in _thresholds:
-            out["thresholds"] = copy.deepcopy(_thresholds[lab_id])
-        return out
+    """Return the current read-only view of a lab (empty dict if unknown)."""
+    return _published.get(lab_id) or {}
 
 def get_snapshot() -> dict:
-    with _lock:
-        snap = copy.deepcopy(_state)
-        # attach thresholds view
-        for lab_id in snap.keys():
-            if lab_id in _thresholds:
-                snap[lab_id]["thresholds"] = copy.deepcopy(_thresholds[lab_id])
+    """Return a read-only {lab_id: lab view} mapping, rebuilt only when state changed."""
+    global _snapshot_cache
+    gen, snap = _snapshot_cache
+    if gen == _generation:
         return snap
+    with _gen_lock:
+        gen = _generation
+    # shallow: lab views are shared, not copied
+    snap = dict(_published)
+    _snapshot_cache = (gen, snap)
+    return snap
+
+# top-level keys of a lab view that snapshot projections may select
+SNAPSHOT_FIELDS = ("sensors", "actuators", "thresholds", "alerts", "last_sensor_seen", "version")
+
+def project(view: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Return view restricted to fields (plus version); shares the read-only sub-dicts."""
+    if not fields:
+        return view
+    keep = set(fields)
+    keep.add("version")
+    return {key: value for key, value in view.items() if key in keep}
+
+def get_labs(lab_ids: Optional[Iterable[str]] = None, fields: Optional[Iterable[str]] = None) -> dict:
+    """Return {lab_id: view} for lab_ids (every lab when None), optionally projected onto fields.
+
+    Unknown lab ids are skipped. Nothing is copied beyond the top-level dicts.
+    """
+    if lab_ids is None:
+        source = get_snapshot()
+    else:
+        source = {lab_id: _published[lab_id] for lab_id in lab_ids if lab_id in _published}
+    if not fields:
+        return source
+    fields = tuple(fields)
+    return {lab_id: project(view, fields) for lab_id, view in source.items()}
 
 def stale_state(lab_id: str, max_age: int = 30) -> bool:
     """Return True if last_sensor_seen is older than max_age seconds."""
-    with _lock:
-        lab = _state.get(lab_id)
-        if not lab:
-            return True
-        last = lab.get("last_sensor_seen", 0)
-        return (int(time.time()) - last) > max_age
+    lab = _published.get(lab_id)
+    if not lab:
+        return True
+    last = lab.get("last_sensor_seen", 0)
+    return (int(time.time()) - last) > max_age
 
 def run_watchdog(publish_interval_sec: int = 30) -> threading.Thread:
     def _loop():
         while True:
             now = int(time.time())
-            with _lock:
-                for lab_id, lab in _state.items():
-                    last = lab.get("last_sensor_seen", 0)
+            for lab_id, lock in list(_locks.items()):
+                with lock:
+                    old = _published[lab_id]
+                    last = old.get("last_sensor_seen", 0)
                     offline = (now - last) > 2 * publish_interval_sec
-                    lab["alerts"]["sensor_offline"] = offline
-                    if offline:
-                        logger.warning("Sensor offline detected for lab=%s last_seen=%s now=%s", lab_id, last, now)
+                    flipped = old["alerts"].get("sensor_offline") != offline
+                    if flipped:
+                        _publish(lab_id, {**old, "alerts": {**old["alerts"], "sensor_offline": offline}})
+                if flipped:
+                    _notify(lab_id)
+                if offline:
+                    logger.warning("Sensor offline detected for lab=%s last_seen=%s now=%s", lab_id, last, now)
             time.sleep(publish_interval_sec)
     th = threading.Thread(target=_loop, daemon=True)
     th.start()
@@ -5,14 +5,25 @@ const labsContainer = document.getElementById("labs-container");
 const statusIndicator = document.getElementById("status-indicator");
 const intervalControl = document.getElementById("poll-interval");
 
+// Last /status version seen; later polls ask only for labs changed since then.
+const statusState = { version: null, etag: null, labs: new Map() };
+
 async function fetchStatus() {
   try {
-    const res = await fetch(`${API_BASE}/status`);
-    if (!res.ok) {
-      throw new Error(`HTTP ${res.status}`);
+    const url = statusState.version
+      ? `${API_BASE}/status?since=${encodeURIComponent(statusState.version)}`
+      : `${API_BASE}/status`;
+    const headers = statusState.etag ? { "If-None-Match": statusState.etag } : {};
+    const res = await fetch(url, { headers });
+    if (res.status !== 304) {
+      if (!res.ok) {
+        throw new Error(`HTTP ${res.status}`);
+      }
+      applyStatus(await res.json());
+      statusState.etag = res.headers.get("ETag");
     }
-    const data = await res.json();
-    renderStatus(data);
+    // re-render even when unchanged so stale/age badges keep counting
+    renderCurrent();
     setIndicator("Online", "ok");
   } catch (err) {
     console.error("Failed to load status", err);
@@ -22,6 +33,53 @@ async function fetchStatus() {
   }
 }
 
+// Prefer the registry's live /events stream; fall back to polling when the
+// browser lacks EventSource or the stream cannot be opened.
+let liveSource = null;
+
+function startLive() {
+  if (!window.EventSource || window.STATUS_POLL_ONLY) {
+    fetchStatus();
+    return;
+  }
+  const source = new EventSource(`${API_BASE}/events`);
+  liveSource = source;
+  let renderTimer = null;
+  source.addEventListener("status", (ev) => {
+    applyStatus(JSON.parse(ev.data));
+    renderCurrent();
+    setIndicator("Live", "ok");
+  });
+  source.onopen = () => {
+    if (!renderTimer) {
+      renderTimer = window.setInterval(renderCurrent, currentInterval());
+    }
+  };
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      source.close();
+      liveSource = null;
+      window.clearInterval(renderTimer);
+      fetchStatus();
+    } else {
+      setIndicator("Reconnecting", "error");
+    }
+  };
+}
+
+function renderCurrent() {
+  renderStatus({ labs: Array.from(statusState.labs.values()) });
+}
+
+function applyStatus(data) {
+  if (!data.delta) {
+    statusState.labs.clear();
+  }
+  (data.labs || []).forEach((lab) => statusState.labs.set(lab.lab_id, lab));
+  (data.removed || []).forEach((labId) => statusState.labs.delete(labId));
+  statusState.version = data.version || null;
+}
+
 function currentInterval() {
   const val = parseInt(intervalControl?.value || REFRESH_MS, 10);
   return Number.isNaN(val) ? REFRESH_MS : Math.max(1000, val);
@@ -148,11 +206,13 @@ function formatTs(ts) {
   return d.toLocaleString();
 }
 
-fetchStatus();
+startLive();
 
 if (intervalControl) {
   intervalControl.value = REFRESH_MS;
-  intervalControl.addEventListener("change", fetchStatus);
+  intervalControl.addEventListener("change", () => {
+    if (!liveSource) fetchStatus();
+  });
 }
 
 function summarizeTemp(sensors = []) {
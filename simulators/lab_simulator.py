@@ -2,14 +2,15 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 import random
 import threading
 import time
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
+from catalog.catalog_store import catalog_mtime, read_json
+from Device_connectors import codec
 from Device_connectors.mqtt_client import MqttClient
 
 BASE_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
@@ -20,10 +21,12 @@ logger = logging.getLogger("LabSimulator")
 
 
 class LabSimulator:
-    def __init__(self, mqtt_host: str, mqtt_port: int, loop_sec: int = 10):
+    def __init__(self, mqtt_host: str, mqtt_port: int, loop_sec: int = 10, sensor_format: str = "json"):
         self.mqtt_host = mqtt_host
         self.mqtt_port = mqtt_port
         self.loop_sec = loop_sec
+        # "json" publishes on .../state, "binary" publishes packed readings on .../bin
+        self.sensor_format = sensor_format.lower()
         self._mqtt = MqttClient(client_id="lab_simulator", host=mqtt_host, port=mqtt_port)
         self._lock = threading.Lock()
         self._labs: Dict[str, Dict] = {}
@@ -35,7 +38,7 @@ class LabSimulator:
         logging.getLogger("paho").setLevel(logging.WARNING)
         self._reload_devices(force=True)
         self._mqtt.connect()
-        self._mqtt.subscribe("labs/+/actuators/+/cmd", self._on_actuator_command)
+        self._mqtt.subscribe("labs/+/actuators/+/cmd", self._on_actuator_command, segments=True)
         logger.info("Simulator connected to MQTT %s:%s", self.mqtt_host, self.mqtt_port)
         # Publish initial OFF states for all actuators so dashboards are not blank
         now = int(time.time())
@@ -49,14 +52,13 @@ class LabSimulator:
     # ------------------------------------------------------------------ catalog handling
     def _reload_devices(self, force: bool = False):
         try:
-            mtime = os.path.getmtime(DEVICES_PATH)
+            mtime = catalog_mtime(DEVICES_PATH)
         except OSError:
             logger.warning("devices.json not found at %s", DEVICES_PATH)
             return
         if not force and mtime == self._devices_mtime:
             return
-        with open(DEVICES_PATH, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
+        data = read_json(DEVICES_PATH)
         labs: Dict[str, Dict] = {}
         for sensor in data.get("sensors", []):
             lab_id = sensor["lab_id"]
@@ -87,11 +89,8 @@ class LabSimulator:
         logger.info("Loaded catalog for %d labs", len(self._labs))
 
     # ------------------------------------------------------------------ actuator callback
-    def _on_actuator_command(self, topic: str, payload: dict):
-        parts = topic.split("/")
-        if len(parts) < 5:
-            return
-        lab_id, actuator_id = parts[1], parts[3]
+    def _on_actuator_command(self, topic: str, payload: dict, segments: Tuple[str, ...]):
+        lab_id, actuator_id = segments
         action = str(payload.get("action", "OFF")).upper()
         ts = int(payload.get("ts", time.time()))
         with self._lock:
@@ -110,7 +109,7 @@ class LabSimulator:
             self._reload_devices()
             now = int(time.time())
             with self._lock:
-                labs_snapshot = json.loads(json.dumps(self._labs))
+                labs_snapshot = codec.loads(codec.dumps(self._labs))
             for lab_id, lab in labs_snapshot.items():
                 temp = lab.get("temp", 26.0)
                 hum = lab.get("hum", 50.0)
@@ -150,7 +149,6 @@ class LabSimulator:
                         self._labs[lab_id]["hum"] = hum
 
                 for sensor in lab.get("sensors", []):
-                    topic = f"labs/{lab_id}/sensors/{sensor['sensor_id']}/state"
                     if sensor.get("type") == "temp":
                         t_val = temp + random.uniform(-0.3, 0.3)
                         h_val = hum + random.uniform(-0.2, 0.2)
@@ -160,8 +158,13 @@ class LabSimulator:
                     else:
                         t_val = temp + random.uniform(-0.3, 0.3)
                         h_val = hum + random.uniform(-0.6, 0.6)
-                    payload = {"t": t_val, "h": h_val, "ts": now, "sensor_id": sensor["sensor_id"]}
-                    self._mqtt.publish_json(topic, payload, retain=True)
+                    if self.sensor_format == "binary":
+                        topic = f"labs/{lab_id}/sensors/{sensor['sensor_id']}/bin"
+                        self._mqtt.publish_raw(topic, codec.pack_sensor(t_val, h_val, now), retain=True)
+                    else:
+                        topic = f"labs/{lab_id}/sensors/{sensor['sensor_id']}/state"
+                        payload = {"t": t_val, "h": h_val, "ts": now, "sensor_id": sensor["sensor_id"]}
+                        self._mqtt.publish_json(topic, payload, retain=True)
                     logger.info("Published sensor %s lab=%s t=%.2f h=%.2f", sensor["sensor_id"], lab_id, t_val, h_val)
 
             sleep_for = max(1.0, self.loop_sec + random.uniform(-1.0, 1.0))
@@ -182,7 +185,8 @@ def main():
     mqtt_host = os.getenv("MQTT_HOST", "localhost")
     mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
     loop_sec = int(os.getenv("SIM_LOOP_SEC", "5"))
-    simulator = LabSimulator(mqtt_host, mqtt_port, loop_sec=loop_sec)
+    sensor_format = os.getenv("SIM_SENSOR_FORMAT", "json")
+    simulator = LabSimulator(mqtt_host, mqtt_port, loop_sec=loop_sec, sensor_format=sensor_format)
     simulator.start()
     simulator.run_forever()
 
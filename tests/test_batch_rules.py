@@ -0,0 +1,89 @@
+"""batch_rules.decide_all must issue the same commands as rules.decide per lab."""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from controller import batch_rules, rules
+
+TYPES = ("fan", "dehumidifier", "humidifier", "heater")
+
+
+def _catalog(n_labs):
+    actuators = []
+    for lab in range(n_labs):
+        for act_type in TYPES:
+            for n in range(1 + lab % 2):
+                actuators.append({"actuator_id": f"{act_type}{lab}_{n}", "lab_id": f"lab{lab}", "type": act_type})
+    return {"sensors": [], "actuators": actuators}
+
+
+def _view(rng, lab, thresholds):
+    now = int(time.time())
+    sensors = {}
+    for n in range(rng.randint(0, 2)):
+        t, h = rng.uniform(10, 35), rng.uniform(20, 80)
+        sensors[f"s{n}"] = {"t": t, "h": h, "avg_t": t, "avg_h": h, "ts": now - rng.randint(0, 50)}
+    actuators = {}
+    for act_type in TYPES:
+        for n in range(2):
+            if rng.random() < 0.7:
+                state = rng.choice(("ON", "OFF", "UNKNOWN"))
+                actuators[f"{act_type}{lab}_{n}"] = {"state": state, "ts": rng.choice((0, now - 5, now - 500))}
+    return {"sensors": sensors, "actuators": actuators, "thresholds": thresholds}
+
+
+def _sorted(cmds):
+    return sorted((c["actuator_id"], c["action"]) for c in cmds)
+
+
+class BatchRulesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        path = os.path.join(self.tmp, "devices.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(_catalog(6), fh)
+        rules.load_device_catalog(path, force=True)
+        self.addCleanup(rules.load_device_catalog, None, True)
+
+    def _check(self, snapshot, thresholds=None):
+        got = {lab_id: _sorted(cmds) for lab_id, cmds in batch_rules.decide_all(snapshot, thresholds).items()}
+        want = {}
+        for lab_id, view in snapshot.items():
+            th = view.get("thresholds") or (thresholds or {}).get(lab_id)
+            cmds = rules.decide(lab_id, view, th) if th else []
+            if cmds:
+                want[lab_id] = _sorted(cmds)
+        self.assertEqual(got, want)
+
+    def test_matches_rules_decide(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            snapshot = {}
+            for lab in range(6):
+                thresholds = {
+                    "t_high": rng.uniform(24, 28),
+                    "t_low": rng.uniform(16, 20),
+                    "h_high": rng.uniform(55, 65),
+                    "h_low": rng.uniform(30, 40),
+                    "hysteresis": rng.choice((0, 0.5, 2)),
+                    "off_delay_sec": rng.choice((0, 60)),
+                }
+                snapshot[f"lab{lab}"] = _view(rng, lab, thresholds)
+            self._check(snapshot)
+
+    def test_fallback_thresholds_and_unknown_labs(self):
+        rng = random.Random(5)
+        thresholds = {"t_high": 26, "t_low": 18, "h_high": 60, "h_low": 35, "hysteresis": 1}
+        snapshot = {"lab0": _view(rng, 0, None), "lab1": _view(rng, 1, None), "ghost": _view(rng, 9, thresholds)}
+        snapshot["lab0"]["sensors"] = {"s0": {"t": 30.0, "h": 70.0, "ts": int(time.time())}}
+        self._check(snapshot, {"lab0": thresholds})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Round trip of the registry's NDJSON /export through POST /bulk."""
+
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+HAVE_DEPS = all(importlib.util.find_spec(name) for name in ("cherrypy", "paho"))
+SOURCE_DIR = os.path.join(os.path.dirname(__file__), "..", "catalog")
+FILES = ("labs.json", "devices.json", "thresholds.json", "permissions.json")
+
+
+def _group(lines):
+    body = {}
+    for line in lines:
+        record = json.loads(line)
+        body.setdefault(record.pop("kind"), []).append(record)
+    return body
+
+
+@unittest.skipUnless(HAVE_DEPS, "registry dependencies (cherrypy, paho-mqtt) not installed")
+class ExportBulkRoundTrip(unittest.TestCase):
+    def setUp(self):
+        from catalog_registry import registry_api
+
+        self.registry_api = registry_api
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def _catalog(self, name, empty=False):
+        path = os.path.join(self.tmp, name)
+        os.mkdir(path)
+        for filename in FILES:
+            if empty:
+                with open(os.path.join(path, filename), "w", encoding="utf-8") as fh:
+                    json.dump({"last_update": ""}, fh)
+            else:
+                shutil.copy(os.path.join(SOURCE_DIR, filename), path)
+        return path
+
+    def _registry(self, catalog_dir):
+        paths = {
+            "LABS_PATH": "labs.json",
+            "DEVICES_PATH": "devices.json",
+            "THRESHOLDS_PATH": "thresholds.json",
+            "PERMISSIONS_PATH": "permissions.json",
+        }
+        patches = [mock.patch.object(self.registry_api, name, os.path.join(catalog_dir, f)) for name, f in paths.items()]
+        patches.append(mock.patch.object(self.registry_api, "get_manager", lambda: None))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return self.registry_api.RegistryAPI()
+
+    def test_export_feeds_bulk(self):
+        source = self._registry(self._catalog("source"))
+        exported = b"".join(source.export_ndjson()).splitlines()
+        body = _group(exported)
+        self.assertIsInstance(body["thresholds"], list)
+
+        target = self._registry(self._catalog("target", empty=True))
+        result = target.handle_post(("bulk",), body)
+        self.assertTrue(result.get("ok"), result)
+        self.assertEqual(_group(b"".join(target.export_ndjson()).splitlines()), body)
+
+    def test_bulk_rejects_unknown_lab_atomically(self):
+        registry = self._registry(self._catalog("source"))
+        before = b"".join(registry.export_ndjson())
+        result = registry.handle_post(
+            ("bulk",),
+            {
+                "sensors": [{"sensor_id": "new_temp_1", "lab_id": "lab1", "type": "temp"}],
+                "actuators": [{"actuator_id": "x_fan_1", "lab_id": "missing_lab", "type": "fan"}],
+            },
+        )
+        self.assertIn("error", result)
+        self.assertEqual(b"".join(registry.export_ndjson()), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""catalog_store journal: replay over the base file, compaction and crash leftovers."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from catalog import catalog_store as cs
+
+
+class CatalogJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, "devices.json")
+        self.data = {
+            "last_update": "",
+            "sensors": [{"sensor_id": "s1", "lab_id": "lab1"}, {"sensor_id": "s2", "lab_id": "lab1"}],
+        }
+        patcher = mock.patch.multiple(cs, BACKEND="json", COMPACT_EVERY=500)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cs.write_json(self.path, json.loads(json.dumps(self.data)))
+
+    def _base(self):
+        with open(self.path, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def _append(self, *ops):
+        cs._replay(self.data, [json.loads(json.dumps(op)) for op in ops])
+        cs.append_journal(self.path, self.data, ops, touch_ts_keys=["last_update"])
+
+    def test_replay_ops(self):
+        self._append(cs.op_put("sensors", "sensor_id", {"sensor_id": "s1", "lab_id": "lab2"}))
+        self._append(cs.op_remove("sensors", "sensor_id", "s2"))
+        self._append(cs.op_put("sensors", "sensor_id", {"sensor_id": "s3", "lab_id": "lab1"}))
+        self._append(cs.op_set(["per_lab", "lab1"], {"t_high": 26}), cs.op_set(["per_lab", "lab2"], {}))
+        self._append(cs.op_unset(["per_lab", "lab2"]))
+        self.assertTrue(os.path.exists(cs.journal_path(self.path)))
+        self.assertEqual(len(self._base()["sensors"]), 2)  # nothing rewritten yet
+
+        data = cs.read_json(self.path)
+        self.assertEqual(data, self.data)
+        self.assertEqual(data["sensors"], [{"sensor_id": "s1", "lab_id": "lab2"}, {"sensor_id": "s3", "lab_id": "lab1"}])
+        self.assertEqual(data["per_lab"], {"lab1": {"t_high": 26}})
+        self.assertNotEqual(data["last_update"], "")
+
+    def test_compacts_after_threshold(self):
+        with mock.patch.object(cs, "COMPACT_EVERY", 4):
+            self._append(cs.op_remove("sensors", "sensor_id", "s1"))
+            self._append(cs.op_remove("sensors", "sensor_id", "s2"))
+        self.assertFalse(os.path.exists(cs.journal_path(self.path)))
+        self.assertEqual(self._base(), self.data)
+        self.assertEqual(self._base()["sensors"], [])
+
+    def test_torn_last_line_is_skipped_and_terminated(self):
+        self._append(cs.op_remove("sensors", "sensor_id", "s1"))
+        with open(cs.journal_path(self.path), "a", encoding="utf-8") as fh:
+            fh.write('{"op":"remove","list":"sens')
+        cs._JOURNAL_LEN.pop(os.path.abspath(self.path), None)  # as after a restart
+        with self.assertLogs("CatalogStore", "WARNING"):
+            self.assertEqual([s["sensor_id"] for s in cs.read_json(self.path)["sensors"]], ["s2"])
+            self._append(cs.op_put("sensors", "sensor_id", {"sensor_id": "s4", "lab_id": "lab1"}))
+        with self.assertLogs("CatalogStore", "WARNING"):
+            self.assertEqual(cs.read_json(self.path), self.data)
+
+    def test_leftover_journal_after_compaction_is_harmless(self):
+        self._append(cs.op_remove("sensors", "sensor_id", "s1"))
+        with open(cs.journal_path(self.path), encoding="utf-8") as fh:
+            leftover = fh.read()
+        # crash between rewriting the document and removing the journal
+        cs.write_json(self.path, self.data)
+        with open(cs.journal_path(self.path), "w", encoding="utf-8") as fh:
+            fh.write(leftover)
+        self.assertEqual(cs.read_json(self.path)["sensors"], [{"sensor_id": "s2", "lab_id": "lab1"}])
+        cs.compact(self.path, self.data)
+        self.assertFalse(os.path.exists(cs.journal_path(self.path)))
+
+    def test_catalog_mtime_covers_journal(self):
+        os.utime(self.path, (1000, 1000))
+        self.assertEqual(cs.catalog_mtime(self.path), 1000)
+        self._append(cs.op_remove("sensors", "sensor_id", "s1"))
+        self.assertGreater(cs.catalog_mtime(self.path), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
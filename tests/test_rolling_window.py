@@ -0,0 +1,46 @@
+"""RollingWindow statistics against a plain recomputation over the same samples."""
+
+import random
+import unittest
+
+from controller.rolling_window import RollingWindow
+
+
+class RollingWindowTest(unittest.TestCase):
+    def test_matches_naive_statistics(self):
+        rng = random.Random(7)
+        window = RollingWindow(5)
+        samples = []
+        for _ in range(200):
+            value = rng.uniform(-10, 40)
+            window.push(value)
+            samples = (samples + [value])[-5:]
+            self.assertEqual(window.values(), samples)
+            self.assertEqual(len(window), len(samples))
+            self.assertAlmostEqual(window.mean, sum(samples) / len(samples))
+            self.assertEqual(window.min, min(samples))
+            self.assertEqual(window.max, max(samples))
+
+    def test_ema(self):
+        window = RollingWindow(3, alpha=0.5)
+        for value in (10, 20, 30):
+            window.push(value)
+        self.assertAlmostEqual(window.ema, 22.5)
+
+    def test_empty(self):
+        window = RollingWindow(4)
+        self.assertEqual((len(window), window.mean, window.min, window.max), (0, 0.0, 0.0, 0.0))
+        self.assertIsNone(window.ema)
+
+    def test_resized_keeps_most_recent(self):
+        window = RollingWindow(5)
+        for value in range(1, 8):
+            window.push(value)
+        smaller = window.resized(2)
+        self.assertEqual(smaller.values(), [6.0, 7.0])
+        self.assertEqual(smaller.ema, window.ema)
+        self.assertEqual(window.resized(10).values(), [3.0, 4.0, 5.0, 6.0, 7.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
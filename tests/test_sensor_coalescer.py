@@ -0,0 +1,53 @@
+"""SensorCoalescer keeps the newest reading per sensor and never applies an older one."""
+
+import itertools
+import unittest
+
+from controller import state_memory as sm
+from Device_connectors.sensor_bridge import SensorCoalescer
+
+_labs = itertools.count()
+
+
+class SensorCoalescerTest(unittest.TestCase):
+    def setUp(self):
+        # state_memory is module-global, so every test uses fresh lab ids
+        self.lab = f"coalesce{next(_labs)}"
+        self.coalescer = SensorCoalescer()
+
+    def _reading(self, sensor_id):
+        return sm.get_lab(self.lab)["sensors"][sensor_id]
+
+    def test_newest_pending_reading_wins(self):
+        self.coalescer.offer(self.lab, "s1", 20.0, 40.0, 100)
+        self.coalescer.offer(self.lab, "s1", 21.0, 41.0, 102)
+        self.coalescer.offer(self.lab, "s1", 19.0, 39.0, 101)
+        self.coalescer.offer(self.lab, "s2", 25.0, 50.0, 90)
+        self.assertEqual(self.coalescer.drain(), 2)
+        self.assertEqual((self._reading("s1")["t"], self._reading("s1")["ts"]), (21.0, 102))
+        self.assertEqual(self._reading("s2")["ts"], 90)
+        stats = self.coalescer.stats()
+        self.assertEqual((stats["received"], stats["coalesced"], stats["stale"], stats["pending"]), (4, 1, 1, 0))
+
+    def test_older_reading_after_drain_is_dropped(self):
+        self.coalescer.offer(self.lab, "s1", 21.0, 41.0, 200)
+        self.coalescer.drain()
+        # e.g. a retained message replayed on reconnect
+        self.coalescer.offer(self.lab, "s1", 18.0, 30.0, 150)
+        self.assertEqual(self.coalescer.drain(), 0)
+        self.assertEqual(self._reading("s1")["ts"], 200)
+        self.coalescer.offer(self.lab, "s1", 22.0, 42.0, 200)
+        self.assertEqual(self.coalescer.drain(), 1)
+        self.assertEqual(self._reading("s1")["t"], 22.0)
+
+    def test_sensors_are_tracked_independently(self):
+        self.coalescer.offer(self.lab, "s1", 21.0, 41.0, 300)
+        self.coalescer.drain()
+        self.coalescer.offer(self.lab, "s2", 23.0, 43.0, 250)
+        self.coalescer.offer(f"{self.lab}b", "s1", 24.0, 44.0, 250)
+        self.assertEqual(self.coalescer.drain(), 2)
+        self.assertEqual(self._reading("s2")["ts"], 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""SQLite catalog backend round trips, driven through catalog_store as the registry does."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from catalog import catalog_store as cs
+from catalog import sqlite_store
+
+
+class SqliteStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        patcher = mock.patch.multiple(cs, BACKEND="sqlite")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_patcher = mock.patch.object(sqlite_store, "DB_PATH", os.path.join(self.tmp, "catalog.db"))
+        db_patcher.start()
+        self.addCleanup(db_patcher.stop)
+        self._reset_conn()
+        self.addCleanup(self._reset_conn)
+
+        self.devices = os.path.join(self.tmp, "devices.json")
+        self.thresholds = os.path.join(self.tmp, "thresholds.json")
+        self._write(self.devices, {
+            "last_update": "2024-01-01 00:00:00",
+            "sensors": [{"sensor_id": "s1", "lab_id": "lab1", "type": "dht22"}],
+            "actuators": [
+                {"actuator_id": "a1", "lab_id": "lab1", "type": "fan"},
+                {"actuator_id": "a2", "lab_id": "lab2", "type": "heater"},
+            ],
+        })
+        self._write(self.thresholds, {"last_update": "", "default": {"t_high": 26}, "per_lab": {"lab1": {"t_high": 25}}})
+
+    @staticmethod
+    def _reset_conn():
+        conn = getattr(sqlite_store._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        sqlite_store._local.conn = None
+
+    @staticmethod
+    def _write(path, data):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+
+    def test_imports_json_on_first_read(self):
+        with open(self.devices, encoding="utf-8") as fh:
+            expected = json.load(fh)
+        self.assertEqual(cs.read_json(self.devices), expected)
+        # later reads come from the database, not the file
+        self._write(self.devices, {"sensors": [], "actuators": []})
+        self.assertEqual(cs.read_json(self.devices), expected)
+
+    def test_write_doc_round_trip(self):
+        data = cs.read_json(self.devices)
+        data["sensors"].append({"sensor_id": "s2", "lab_id": "lab2", "type": "dht11"})
+        del data["actuators"][0]
+        data["extra"] = {"note": "kept as metadata"}
+        cs.write_json(self.devices, json.loads(json.dumps(data)))
+        self.assertEqual(cs.read_json(self.devices), data)
+        with open(self.devices, encoding="utf-8") as fh:
+            self.assertEqual(json.load(fh), data)
+
+    def test_apply_ops_matches_json_replay(self):
+        expected = cs.read_json(self.devices)
+        ops = [
+            cs.op_put("actuators", "actuator_id", {"actuator_id": "a1", "lab_id": "lab3", "type": "fan"}),
+            cs.op_remove("actuators", "actuator_id", "a2"),
+            cs.op_put("sensors", "sensor_id", {"sensor_id": "s9", "lab_id": "lab3", "type": "dht22"}),
+            cs.op_set(["last_update"], "2024-02-02 00:00:00"),
+        ]
+        cs._replay(expected, json.loads(json.dumps(ops)))
+        cs.append_journal(self.devices, expected, ops)
+        self.assertEqual(cs.read_json(self.devices), expected)
+        self.assertFalse(os.path.exists(cs.journal_path(self.devices)))
+
+    def test_nested_set_and_unset(self):
+        expected = cs.read_json(self.thresholds)
+        ops = [
+            cs.op_set(["per_lab", "lab2"], {"t_high": 24}),
+            cs.op_set(["per_lab", "lab1", "h_high"], 60),
+            cs.op_set(["default", "t_low"], 18),
+            cs.op_unset(["per_lab", "lab2"]),
+            cs.op_unset(["default", "t_high"]),
+        ]
+        cs._replay(expected, json.loads(json.dumps(ops)))
+        cs.append_journal(self.thresholds, expected, ops)
+        self.assertEqual(cs.read_json(self.thresholds), expected)
+        self.assertEqual(expected["per_lab"], {"lab1": {"t_high": 25, "h_high": 60}})
+        self.assertEqual(expected["default"], {"t_low": 18})
+
+    def test_other_documents_stay_json(self):
+        other = os.path.join(self.tmp, "thingspeak_keys.json")
+        self._write(other, {"keys": []})
+        self.assertFalse(sqlite_store.handles(other))
+        cs.write_json(other, {"keys": [1]})
+        self.assertEqual(cs.read_json(other), {"keys": [1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
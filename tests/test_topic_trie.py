@@ -0,0 +1,51 @@
+"""TopicTrie wildcard matching and captured segments."""
+
+import unittest
+
+from Device_connectors.topic_trie import TopicTrie
+
+
+class TopicTrieTest(unittest.TestCase):
+    def setUp(self):
+        self.trie = TopicTrie()
+        self.trie.add("labs/+/sensors/+/state", "state")
+        self.trie.add("labs/+/sensors/batch", "batch")
+        self.trie.add("labs/#", "all")
+        self.trie.add("labs/lab1/sensors/s1/state", "exact")
+        self.trie.add("#", "everything")
+
+    def test_single_level_wildcards(self):
+        values, segments = self.trie.match_segments("labs/lab1/sensors/s2/state")
+        self.assertEqual(values, ("state", "all", "everything"))
+        self.assertEqual(segments, (("lab1", "s2"), ("lab1/sensors/s2/state",), ("labs/lab1/sensors/s2/state",)))
+
+    def test_values_in_insertion_order(self):
+        self.assertEqual(self.trie.match("labs/lab1/sensors/s1/state"), ("state", "all", "exact", "everything"))
+
+    def test_batch_topic(self):
+        values, segments = self.trie.match_segments("labs/lab2/sensors/batch")
+        self.assertEqual(values, ("batch", "all", "everything"))
+        self.assertEqual(segments[0], ("lab2",))
+
+    def test_hash_matches_parent_level(self):
+        values, segments = self.trie.match_segments("labs")
+        self.assertEqual(values, ("all", "everything"))
+        self.assertEqual(segments[0], ("",))
+
+    def test_plus_needs_exactly_one_level(self):
+        self.assertEqual(self.trie.match("labs/lab1/sensors/state"), ("all", "everything"))
+        self.assertEqual(self.trie.match("other/topic"), ("everything",))
+
+    def test_system_topics_skip_leading_wildcards(self):
+        self.assertEqual(self.trie.match("$SYS/broker/uptime"), ())
+        self.trie.add("$SYS/#", "sys")
+        self.assertEqual(self.trie.match("$SYS/broker/uptime"), ("sys",))
+
+    def test_add_invalidates_cache(self):
+        self.assertEqual(self.trie.match("labs/lab1/actuators/a1/state"), ("all", "everything"))
+        self.trie.add("labs/+/actuators/+/state", "actuator")
+        self.assertEqual(self.trie.match("labs/lab1/actuators/a1/state"), ("all", "everything", "actuator"))
+
+
+if __name__ == "__main__":
+    unittest.main()